@@ -75,6 +75,24 @@ class Disease:
         self.gene_codes = gene_codes
         self.init()
 
+    def copy(self) -> Disease:
+        """复制病原体的可变状态, 不会再次应用基因代码."""
+        disease = object.__new__(type(self))
+        disease.__dict__.update(self.__dict__)
+        disease.infectivity = self.infectivity.copy()
+        disease.severity = self.severity.copy()
+        disease.lethality = self.lethality.copy()
+        disease.mutation_multiplier = self.mutation_multiplier.copy()
+        disease.cure_resistance = self.cure_resistance.copy()
+        disease.base_cross_country_transmission = dict(self.base_cross_country_transmission)
+        disease.base_environmental_effectivity = dict(self.base_environmental_effectivity)
+        disease.environmental_conditions = {
+            key: value.copy() for key, value in self.environmental_conditions.items()
+        }
+        disease.increase_speed = {key: value.copy() for key, value in self.increase_speed.items()}
+        disease.gene_codes = list(self.gene_codes)
+        return disease
+
     def init(self):
         # 应用基因代码
         for gene_code in self.gene_codes:
@@ -0,0 +1,289 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于在线统计多次模拟(集合)的结果, 不保存任何轨迹.
+
+所有统计量占用的内存与模拟次数无关, 并且可以合并多个工作进程的部分结果.
+"""
+
+from __future__ import annotations
+
+import math
+import typing
+import weakref
+
+if typing.TYPE_CHECKING:
+    from .world import World
+
+
+class RunningStats:
+    """Welford算法在线计算均值与方差."""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # 与均值之差的平方和
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def push(self, value: float) -> None:
+        """加入一个样本."""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.minimum = min(self.minimum, value)
+        self.maximum = max(self.maximum, value)
+
+    def merge(self, other: RunningStats) -> None:
+        """合并另一个统计量(Chan等人的并行算法)."""
+        if other.count == 0:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self) -> float:
+        """样本方差."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        """样本标准差."""
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """对数分桶的分位数草图, 相对误差不超过 accuracy, 可合并.
+
+    只接受非负数值.
+    """
+
+    def __init__(self, accuracy: float = 0.01) -> None:
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.buckets: dict[int, int] = {}
+        self.zeros = 0  # 值为0的样本数
+        self.count = 0
+
+    def push(self, value: float) -> None:
+        """加入一个样本."""
+        if value < 0:
+            msg = "分位数草图只接受非负数值"
+            raise ValueError(msg)
+        self.count += 1
+        if value == 0:
+            self.zeros += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: QuantileSketch) -> None:
+        """合并另一个草图, 两者的精度必须相同."""
+        if other.gamma != self.gamma:
+            msg = "只能合并精度相同的分位数草图"
+            raise ValueError(msg)
+        self.count += other.count
+        self.zeros += other.zeros
+        for key, count in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + count
+
+    def quantile(self, q: float) -> float:
+        """估计q分位数(0 <= q <= 1)."""
+        if self.count == 0:
+            return math.nan
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if rank < seen:
+                return 2 * self.gamma**key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class Histogram:
+    """固定区间的等宽直方图, 区间外的样本分别计入下溢与上溢."""
+
+    def __init__(self, low: float, high: float, bins: int = 64) -> None:
+        if high <= low:
+            msg = "直方图上界必须大于下界"
+            raise ValueError(msg)
+        self.low = low
+        self.high = high
+        self.counts = [0] * bins
+        self.underflow = 0
+        self.overflow = 0
+
+    def push(self, value: float) -> None:
+        """加入一个样本."""
+        if value < self.low:
+            self.underflow += 1
+        elif value >= self.high:
+            self.overflow += 1
+        else:
+            bins = len(self.counts)
+            self.counts[int((value - self.low) / (self.high - self.low) * bins)] += 1
+
+    def merge(self, other: Histogram) -> None:
+        """合并区间与分箱数相同的另一个直方图."""
+        if (other.low, other.high, len(other.counts)) != (
+            self.low,
+            self.high,
+            len(self.counts),
+        ):
+            msg = "只能合并区间与分箱数相同的直方图"
+            raise ValueError(msg)
+        self.counts = [a + b for a, b in zip(self.counts, other.counts, strict=True)]
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+    def edges(self) -> list[float]:
+        """各分箱的边界."""
+        bins = len(self.counts)
+        return [self.low + (self.high - self.low) * i / bins for i in range(bins + 1)]
+
+
+class OutcomeStats:
+    """某个结果(如发现天数)的均值/方差、分位数与直方图."""
+
+    def __init__(self, low: float, high: float, bins: int = 64) -> None:
+        self.stats = RunningStats()
+        self.sketch = QuantileSketch()
+        self.histogram = Histogram(low, high, bins)
+        self.missing = 0  # 模拟结束时仍未出现该结果的次数
+
+    def push(self, value: float | None) -> None:
+        """加入一个样本, None表示该结果没有出现."""
+        if value is None:
+            self.missing += 1
+            return
+        self.stats.push(value)
+        self.sketch.push(value)
+        self.histogram.push(value)
+
+    def merge(self, other: OutcomeStats) -> None:
+        """合并另一个结果统计."""
+        self.stats.merge(other.stats)
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+        self.missing += other.missing
+
+
+class _Replica:
+    """单次模拟进行中的状态."""
+
+    def __init__(self) -> None:
+        self.detected_day: int | None = None
+        self.cure_day: int | None = None
+        self.peak_infections = 0
+
+
+class EnsembleStatistics:
+    """通过 on_update 回调在线统计多次模拟.
+
+    用法: 对每个世界调用 attach, 模拟结束后调用 finish.
+    每天的世界/国家数值按天数分别统计, 结果的统计在 finish 时加入.
+    """
+
+    def __init__(
+        self,
+        max_days: int = 3650,  # 天数直方图上界
+        max_infections: float = 1e10,  # 峰值感染人数直方图上界
+        bins: int = 64,  # 直方图分箱数
+    ) -> None:
+        self.replicas = 0  # 已完成的模拟次数
+        self.world_values: list[dict[str, RunningStats]] = []  # 每天的世界数值
+        self.country_values: list[dict[str, dict[str, RunningStats]]] = []  # 每天的国家数值
+        self.days_to_detection = OutcomeStats(0, max_days, bins)
+        self.days_to_cure = OutcomeStats(0, max_days, bins)
+        self.peak_infections = OutcomeStats(0, max_infections, bins)
+        # 进行中的模拟, 只统计 attach 过的世界, 被丢弃的世界自动移除
+        self._active: weakref.WeakKeyDictionary[World, _Replica] = weakref.WeakKeyDictionary()
+
+    def __getstate__(self) -> dict:
+        # 进行中的模拟不能跨进程传递, 只传递已统计的数值
+        state = dict(self.__dict__)
+        del state["_active"]
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._active = weakref.WeakKeyDictionary()
+
+    def attach(self, world: World) -> None:
+        """在世界上注册回调, 开始统计一次模拟."""
+        self._active[world] = _Replica()
+        # 分叉世界默认复制回调, 从已 attach 的世界分叉时回调已经存在
+        if self.observe not in world.updater.callbacks.get("on_update", ()):
+            world.updater.register_callback("on_update", self.observe)
+
+    def observe(self, world: World) -> None:
+        """on_update 回调, 统计当天的数值, 忽略没有 attach 的世界(如分叉世界)."""
+        replica = self._active.get(world)
+        if replica is None:
+            return
+        day = world.time
+        while len(self.world_values) < day:
+            self.world_values.append({})
+            self.country_values.append({})
+
+        infections = world.total_infections()
+        world_values = self.world_values[day - 1]
+        for key, value in (
+            ("total_infections", infections),
+            ("total_deaths", world.total_deaths()),
+            ("cure_money", world.cure_money),
+        ):
+            world_values.setdefault(key, RunningStats()).push(value)
+        country_values = self.country_values[day - 1]
+        for country in world.readonly_countries:
+            values = country_values.setdefault(
+                country.name,
+                {"infected_population": RunningStats(), "deathed_population": RunningStats()},
+            )
+            values["infected_population"].push(country.infected_population)
+            values["deathed_population"].push(country.deathed_population)
+
+        if replica.detected_day is None and world.disease_detected:
+            replica.detected_day = day
+        if replica.cure_day is None and world.cure_finished:
+            replica.cure_day = day
+        replica.peak_infections = max(replica.peak_infections, infections)
+
+    def finish(self, world: World) -> None:
+        """结束一次模拟, 将其结果加入统计."""
+        replica = self._active.pop(world, None)
+        if replica is None:
+            return
+        self.replicas += 1
+        self.days_to_detection.push(replica.detected_day)
+        self.days_to_cure.push(replica.cure_day)
+        self.peak_infections.push(replica.peak_infections)
+
+    def merge(self, other: EnsembleStatistics) -> None:
+        """合并另一个工作进程的部分统计.
+
+        每天的数值包括进行中的模拟已经统计的天数, 结果(发现天数等)只包括已完成的模拟.
+        """
+        self.replicas += other.replicas
+        while len(self.world_values) < len(other.world_values):
+            self.world_values.append({})
+            self.country_values.append({})
+        for mine, theirs in zip(self.world_values, other.world_values, strict=False):
+            for key, stats in theirs.items():
+                mine.setdefault(key, RunningStats()).merge(stats)
+        for mine, theirs in zip(self.country_values, other.country_values, strict=False):
+            for name, values in theirs.items():
+                target = mine.setdefault(name, {})
+                for key, stats in values.items():
+                    target.setdefault(key, RunningStats()).merge(stats)
+        self.days_to_detection.merge(other.days_to_detection)
+        self.days_to_cure.merge(other.days_to_cure)
+        self.peak_infections.merge(other.peak_infections)
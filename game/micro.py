@@ -0,0 +1,231 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于个体级别的微观模拟.
+
+每个国家的每种个体状态(感染/死亡/治愈及附加标记)用一个位集表示, 位集是Python整数,
+第i位对应第i个个体.
+感染、死亡与治愈都是对整个位集的按位运算, 由C实现的大整数运算完成, 每个个体只占若干比特.
+"""
+
+from __future__ import annotations
+
+import math
+import typing
+
+from .rate import rng
+from .world import Updater
+
+if typing.TYPE_CHECKING:
+    from .world import Country, World
+
+PRECISION = 20  # 稠密生成时随机概率的二进制精度
+SPARSE_PROBABILITY = 1 / 64  # 低于该概率时逐个生成为1的位
+HEAL_RATE = 0.25  # 每天治愈25%的感染者
+
+
+def bernoulli_mask(size: int, probability: float) -> int:
+    """生成size位的随机位集, 每一位独立地以probability的概率为1.
+
+    概率较小时按几何分布跳过为0的位, 只生成为1的位, 任意小的概率都是精确的.
+    否则将概率按二进制展开, 从最低位开始, 该位为1时与随机位集取或, 为0时取与.
+    """
+    probability = min(max(probability, 0.0), 1.0)
+    if probability < SPARSE_PROBABILITY:
+        return _sparse_mask(size, probability)
+    bits = round(probability * (1 << PRECISION))
+    if bits == 0:
+        return 0
+    if bits >= 1 << PRECISION:
+        return (1 << size) - 1
+    mask = 0
+    steps = PRECISION
+    while not bits & 1:  # 末尾的0对全0位集无影响
+        bits >>= 1
+        steps -= 1
+    for _ in range(steps):
+        if bits & 1:
+            mask |= rng.getrandbits(size)
+        else:
+            mask &= rng.getrandbits(size)
+        bits >>= 1
+    return mask
+
+
+def _sparse_mask(size: int, probability: float) -> int:
+    if probability <= 0 or size == 0:
+        return 0
+    buffer = bytearray((size + 7) // 8)
+    log_q = math.log1p(-probability)
+    position = -1
+    while True:
+        position += 1 + int(math.log(1.0 - rng.random()) / log_q)  # 两个为1的位之间的间隔
+        if position >= size:
+            break
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, "little")
+
+
+class Population:
+    """一个国家所有个体的状态."""
+
+    def __init__(self, size: int, infected: int = 0, deathed: int = 0) -> None:
+        self.size = size  # 个体数量
+        self.everyone = (1 << size) - 1
+        self.infected = (1 << infected) - 1  # 已感染
+        self.dead = ((1 << deathed) - 1) << infected  # 已死亡
+        self.healed = 0  # 曾被治愈, 与 Updater 一样治愈者可以再次被感染
+        self.flags: dict[str, int] = {}  # 附加标记, 被标记为"quarantined"的个体不会被感染
+
+    @classmethod
+    def from_country(cls, country: Country) -> Population:
+        """根据国家的人口与现有感染/死亡人数创建个体状态."""
+        return cls(country.population, country.infected_population, country.deathed_population)
+
+    def copy(self) -> Population:
+        """复制个体状态, 位集本身不可变, 可以直接共享."""
+        population = object.__new__(Population)
+        population.__dict__.update(self.__dict__)
+        population.flags = dict(self.flags)
+        return population
+
+    @property
+    def susceptible(self) -> int:
+        """易感者位集."""
+        return self.everyone & ~(self.infected | self.dead)
+
+    def set_flag(self, name: str, mask: int) -> None:
+        """设置附加标记."""
+        self.flags[name] = mask & self.everyone
+
+    def infect(self, expected: float) -> None:
+        """在易感者中随机感染, 期望人数为expected."""
+        susceptible = self.susceptible & ~self.flags.get("quarantined", 0)
+        count = susceptible.bit_count()
+        if count == 0 or expected <= 0:
+            return
+        self.infected |= susceptible & bernoulli_mask(self.size, expected / count)
+
+    def kill(self, death_rate: float) -> None:
+        """感染者以death_rate的概率死亡."""
+        self.dead |= self.infected & bernoulli_mask(self.size, death_rate)
+        self.infected &= ~self.dead
+
+    def heal(self, heal_rate: float) -> None:
+        """感染者以heal_rate的概率治愈, 治愈者重新成为易感者."""
+        healed = self.infected & bernoulli_mask(self.size, heal_rate)
+        self.infected &= ~healed
+        self.healed |= healed
+
+    def _pick(self, mask: int, count: int) -> int:
+        """从mask中随机选出count个为1的位, 不足时全部选出."""
+        positions = [index for index, bit in enumerate(bin(mask)[:1:-1]) if bit == "1"]
+        buffer = bytearray((self.size + 7) // 8)
+        for position in rng.sample(positions, min(max(count, 0), len(positions))):
+            buffer[position >> 3] |= 1 << (position & 7)
+        return int.from_bytes(buffer, "little")
+
+    def reconcile(self, country: Country) -> None:
+        """将回调等对国家感染/死亡人数的修改同步到个体状态, 随机选出被修改的个体."""
+        if country.population != self.size:
+            msg = f"{country.name}: 微观模拟不支持修改国家人口"
+            raise ValueError(msg)
+        deaths = country.deathed_population - self.dead.bit_count()
+        if deaths > 0:  # 优先从感染者中选出死者
+            dead = self._pick(self.infected, deaths)
+            dead |= self._pick(self.susceptible, deaths - dead.bit_count())
+            self.dead |= dead
+            self.infected &= ~dead
+        elif deaths < 0:  # 复活者重新成为易感者
+            self.dead &= ~self._pick(self.dead, -deaths)
+        infections = country.infected_population - self.infected.bit_count()
+        if infections > 0:
+            self.infected |= self._pick(self.susceptible, infections)
+        elif infections < 0:  # 移出的感染者重新成为易感者
+            self.infected &= ~self._pick(self.infected, -infections)
+
+    def aggregate(self, country: Country) -> None:
+        """将个体状态汇总到国家的感染/死亡人数."""
+        country.infected_population = self.infected.bit_count()
+        country.deathed_population = self.dead.bit_count()
+
+
+class MicroUpdater(Updater):
+    """个体级别的更新器, 使用与 Updater 相同的病原体参数.
+
+    感染、死亡与治愈按个体随机发生, 结果汇总回国家的感染/死亡人数, 回调与界面不受影响.
+    回调、定时事件对国家感染/死亡人数的修改在下一阶段开始时同步到个体状态.
+    与 Updater 一样, 期望人数四舍五入后不足1人时该阶段作用于全部感染者.
+    """
+
+    def __init__(
+        self,
+        world: World,
+        callbacks: dict[str, list[typing.Callable]] | None = None,  # 回调函数
+    ) -> None:
+        super().__init__(world, callbacks)
+        self.populations = [
+            Population.from_country(country) for country in world.readonly_countries
+        ]
+
+    @classmethod
+    def install(cls, world: World) -> MicroUpdater:
+        """将世界切换为微观模拟, 保留已注册的回调函数."""
+        world.updater = cls(world, world.updater.callbacks)
+        return world.updater
+
+    def fork(self, world: World, callbacks: bool = True) -> MicroUpdater:
+        updater = super().fork(world, callbacks)
+        updater.populations = [population.copy() for population in self.populations]
+        return updater
+
+    def _reconcile(self, world: World) -> None:
+        for country, population in zip(world.readonly_countries, self.populations, strict=True):
+            population.reconcile(country)
+
+    def _aggregate(self, world: World) -> None:
+        for country, population in zip(world.countries, self.populations, strict=True):
+            population.aggregate(country)
+
+    def update_infection(self) -> None:
+        """更新每天感染人数."""
+        world = self.world
+        self._reconcile(world)
+        disease = world.readonly_disease
+        for country, population in zip(world.readonly_countries, self.populations, strict=True):
+            infection_rate = disease.infectivity.value * country.internal_infectivity
+            for key, value in country.environment.items():
+                if value:
+                    infection_rate *= 1 + disease.environmental_conditions[key].value
+            population.infect(infection_rate * country.population * country.density)
+        self._aggregate(world)
+
+    def update_death(self) -> None:
+        """更新每天死亡人数."""
+        world = self.world
+        self._reconcile(world)
+        for country, population in zip(world.readonly_countries, self.populations, strict=True):
+            death_rate = world.readonly_disease.lethality.value * country.internal_lethality
+            death_rate *= 1 - country.wealth * 0.01
+            death_rate *= 1 - country.global_importance * 0.01
+            if round(death_rate * country.infected_population) < 1:
+                death_rate = 1.0
+            population.kill(death_rate)
+        self._aggregate(world)
+        if world.total_population - world.total_deaths() <= 0:
+            self._call_callbacks("full_deathed")
+            world.full_deathed = True
+
+    def update_healing(self) -> None:
+        """更新每天治愈人数."""
+        world = self.world
+        if world.cure_money < world.cure_required_money:
+            return
+        self._reconcile(world)
+        for country, population in zip(world.readonly_countries, self.populations, strict=True):
+            heal_rate = HEAL_RATE
+            if round(country.infected_population * heal_rate) < 1:
+                heal_rate = 1.0
+            population.heal(heal_rate)
+        self._aggregate(world)
+        if world.total_infections() <= 0:
+            self._call_callbacks("full_healthed")
@@ -1,6 +1,17 @@
 """该代码用于创建多个带有随机的百分比."""
 
 import random
+import typing
+
+rng = random.Random()  # 模拟使用的随机数生成器, 回放需要固定它的种子
+
+
+def seed(value: int | None = None) -> int:
+    """设置随机种子并返回它, 不指定时随机生成一个."""
+    if value is None:
+        value = random.SystemRandom().getrandbits(63)
+    rng.seed(value)
+    return value
 
 
 class PctBase:
@@ -8,13 +19,19 @@ class PctBase:
         self.value = value / 100  # 将百分比转换为小数
         self.stddev = stddev
 
+    def copy(self) -> typing.Self:
+        """复制百分比对象."""
+        pct = object.__new__(type(self))
+        pct.__dict__.update(self.__dict__)
+        return pct
+
     def pct_to_float(self) -> float:
         """将百分比转换为浮点数."""
         return self.value
 
     def apply_stddev(self, value: float) -> float:
         """应用标准差, 返回波动后的值."""
-        return random.gauss(value, self.stddev / 100)
+        return rng.gauss(value, self.stddev / 100)
 
     def __float__(self) -> float:
         return float(self.value)
@@ -74,7 +91,7 @@ class PctNoNegSelfStddev(PctNoNeg):
         super().__init__(value, stddev / 50)
 
     def apply_stddev(self, value: float) -> float:
-        result = random.gauss(value, random.gauss(self.value, self.stddev))
+        result = rng.gauss(value, rng.gauss(self.value, self.stddev))
         return max(result, 0)
 
 
@@ -105,12 +122,12 @@ class PctWithStddevNonLinearDecayNoNeg(PctWithStddevNonLinearDecay):
 
 class PctWithSelfStddevNonLinearDecayNoNeg(PctWithStddevNonLinearDecay):
     def apply_stddev(self, value: float) -> float:
-        result = random.gauss(value, random.gauss(self.value, self.stddev))
+        result = rng.gauss(value, rng.gauss(self.value, self.stddev))
         return max(result, 0)
 
 
 def random_boolean(probability: float | PctBase):
-    return random.random() < (
+    return rng.random() < (
         probability
         if isinstance(probability, float | int)
         else probability.pct_to_float()
@@ -0,0 +1,440 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于记录与回放游戏.
+
+回放文件只包含随机种子、创建世界的完整参数(包括默认值)以及每个外部操作及其发生的天数, 通常只有几KB.
+回放时从这些信息重新模拟, 并定期在内存中保存关键帧(分叉的世界与随机数状态), 以便快速跳转到任意一天.
+
+两天之间记录的操作在第t天的更新结束之后、第t+1天的更新开始之前重新执行.
+更新过程中的操作只能在通过 `Recorder.register_callback` 注册的回调中执行,
+记录时连同事件名称及其在当天的序号一起保存, 回放时在同一事件的同一次触发中重新执行.
+这些回调在 setup 注册的回调之后执行.
+
+记录与回放各自保存随机数生成器的状态, 只在模拟时临时换入 `rate.rng`,
+不影响进程中其他世界的随机数序列.
+"""
+
+from __future__ import annotations
+
+import bisect
+import contextlib
+import functools
+import json
+import random
+import typing
+
+from . import rate
+from .diseases import Disease
+from .gene_codes import GeneCode, LongTermGeneCode
+from .params_factory import ParamsFactory
+from .world import Country, World
+
+if typing.TYPE_CHECKING:
+    import os
+
+    from .symptoms import SymptomsTree
+
+VERSION = 2  # 回放文件格式版本
+EVENTS = (
+    "disease_detected",
+    "full_deathed",
+    "cure_finished",
+    "full_healthed",
+    "on_update",
+)  # 可以在其中记录操作的回调事件
+
+
+def _encode(value: typing.Any) -> typing.Any:
+    """将参数转换为可以写入JSON的数据."""
+    if isinstance(value, rate.PctBase):
+        return {"__pct__": type(value).__name__, "state": dict(value.__dict__)}
+    if isinstance(value, GeneCode):
+        if value.other_disease_modifys:
+            msg = "包含函数的基因代码无法记录"
+            raise TypeError(msg)
+        return {"__gene_code__": _encode(value.__dict__)}
+    if isinstance(value, LongTermGeneCode) or callable(value):
+        msg = f"{value!r}无法记录"
+        raise TypeError(msg)
+    if isinstance(value, dict):
+        return {key: _encode(item) for key, item in value.items()}
+    if isinstance(value, list | tuple):
+        return [_encode(item) for item in value]
+    return value
+
+
+def _decode(value: typing.Any) -> typing.Any:
+    """将JSON数据还原为参数, 每次调用都创建新的对象."""
+    if isinstance(value, dict):
+        if "__pct__" in value:
+            pct = object.__new__(getattr(rate, value["__pct__"]))
+            pct.__dict__.update(value["state"])
+            return pct
+        if "__gene_code__" in value:
+            gene_code = object.__new__(GeneCode)
+            gene_code.__dict__.update(_decode(value["__gene_code__"]))
+            return gene_code
+        return {key: _decode(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    return value
+
+
+def _find_symptom(tree: SymptomsTree, name: str) -> typing.Any:
+    for root in tree.roots:
+        node = root.find_symptom(name)
+        if node:
+            return node.symptom
+    msg = f"Symptom {name} not found."
+    raise ValueError(msg)
+
+
+def _evolve(world: World, tree: SymptomsTree, name: str) -> None:
+    tree.evolve_symptom(name, world.disease)
+
+
+def _lock(_world: World, tree: SymptomsTree, name: str) -> None:
+    _find_symptom(tree, name).lock()
+
+
+def _unlock(_world: World, tree: SymptomsTree, name: str) -> None:
+    _find_symptom(tree, name).unlock()
+
+
+def _add_gene_code(world: World, _tree: SymptomsTree, gene_code: dict) -> None:
+    gene_code = _decode(gene_code)
+    disease = world.disease
+    disease.gene_codes.append(gene_code)
+    gene_code.apply_effects(disease)
+
+
+def _remove_gene_code(world: World, _tree: SymptomsTree, index: int) -> None:
+    del world.disease.gene_codes[index]
+
+
+def _set(world: World, _tree: SymptomsTree, target: str, key: str, value: typing.Any) -> None:
+    if target == "world":
+        obj = world
+    elif target == "disease":
+        obj = world.disease
+    else:  # "country:<序号>"
+        obj = world.countries[int(target.partition(":")[2])]
+    setattr(obj, key, _decode(value))
+
+
+ACTIONS: dict[str, typing.Callable[..., None]] = {
+    "evolve": _evolve,  # 进化症状
+    "lock": _lock,  # 锁定症状
+    "unlock": _unlock,  # 解锁症状
+    "add_gene_code": _add_gene_code,  # 添加基因代码
+    "remove_gene_code": _remove_gene_code,  # 移除基因代码
+    "set": _set,  # 修改世界/病原体/国家的属性
+}
+
+
+def register_action(kind: str, action: typing.Callable[..., None]) -> None:
+    """注册自定义操作, 参数为世界、症状树以及记录的参数(必须可以写入JSON)."""
+    ACTIONS[kind] = action
+
+
+def build_world(config: dict) -> World:
+    """根据记录的参数创建世界."""
+    disease = Disease(**_decode(config["disease"]))
+    countries = [Country(**_decode(country)) for country in config["countries"]]
+    return World(disease, countries, **_decode(config["world"]))
+
+
+class ReplayLog:
+    """回放记录: 随机种子、创建世界的参数与外部操作."""
+
+    def __init__(
+        self,
+        seed: int,  # 随机种子
+        config: dict,  # 创建世界的参数
+        actions: list[tuple[int, str | None, int, str, list]] | None = None,  # 见下
+        length: int = 0,  # 记录的总天数
+    ) -> None:
+        self.seed = seed
+        self.config = config
+        # (天数, 事件或None, 事件在当天的序号, 操作, 参数)
+        self.actions = [] if actions is None else actions
+        self.length = length
+
+    def dumps(self) -> str:
+        """转换为JSON字符串."""
+        return json.dumps(
+            {
+                "version": VERSION,
+                "seed": self.seed,
+                "config": self.config,
+                "actions": self.actions,
+                "length": self.length,
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def loads(cls, data: str) -> ReplayLog:
+        """从JSON字符串读取."""
+        data = json.loads(data)
+        if data["version"] != VERSION:
+            msg = f"不支持的回放文件版本: {data['version']}"
+            raise ValueError(msg)
+        return cls(
+            data["seed"],
+            data["config"],
+            [tuple(action) for action in data["actions"]],
+            data["length"],
+        )
+
+    def save(self, path: str | os.PathLike) -> None:
+        """保存到文件."""
+        with open(path, "w", encoding="utf-8") as file:  # noqa: PTH123
+            file.write(self.dumps())
+
+    @classmethod
+    def load(cls, path: str | os.PathLike) -> ReplayLog:
+        """从文件读取."""
+        with open(path, encoding="utf-8") as file:  # noqa: PTH123
+            return cls.loads(file.read())
+
+
+class _RandomState:
+    """保存独立的随机数状态, 模拟时临时换入 rate.rng, 可以嵌套使用."""
+
+    def __init__(self, seed: int) -> None:
+        self.state = random.Random(seed).getstate()
+        self._depth = 0
+
+    @contextlib.contextmanager
+    def active(self) -> typing.Iterator[None]:
+        if self._depth:
+            yield
+            return
+        outer = rate.rng.getstate()
+        rate.rng.setstate(self.state)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            self.state = rate.rng.getstate()
+            rate.rng.setstate(outer)
+
+
+class _EventCounter:
+    """统计每个事件在当天触发的次数."""
+
+    def __init__(self) -> None:
+        self.tick = -1
+        self.counts: dict[str, int] = {}
+
+    def next(self, event: str, tick: int) -> int:
+        if tick != self.tick:
+            self.tick = tick
+            self.counts = {}
+        occurrence = self.counts.get(event, 0)
+        self.counts[event] = occurrence + 1
+        return occurrence
+
+
+class Recorder:
+    """创建世界并记录所有外部操作.
+
+    setup 在世界创建后调用, 用于注册回调与定时事件, 回放时会以同样的方式调用.
+    更新世界必须使用 Recorder.update.
+    """
+
+    def __init__(
+        self,
+        disease_params: typing.Mapping,  # 病原体参数(不能包含函数)
+        countries_params: list[typing.Mapping],  # 各国家参数
+        world_params: typing.Mapping | None = None,  # 世界参数
+        tree_factory: typing.Callable[[], SymptomsTree] | None = None,  # 创建症状树
+        seed: int | None = None,  # 随机种子, 不指定时随机生成
+        setup: typing.Callable[[World], None] | None = None,
+    ) -> None:
+        # 记录包括默认值在内的完整参数, 回放时每个对象都重新创建, 不会共享构造函数的默认参数
+        config = {
+            "disease": _encode(
+                {**ParamsFactory.get_default_disease_params(), **disease_params},
+            ),
+            "countries": [
+                _encode({**ParamsFactory.get_default_country_params(), **params})
+                for params in countries_params
+            ],
+            "world": _encode(
+                {**ParamsFactory.get_default_world_params(), **(world_params or {})},
+            ),
+        }
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(63)
+        self.log = ReplayLog(seed, config)
+        self._random = _RandomState(seed)
+        self._callbacks: dict[str, list[typing.Callable]] = {}
+        self._counter = _EventCounter()
+        self._event: tuple[str, int] | None = None  # 正在执行的事件及其在当天的序号
+        self._updating = False
+        with self._random.active():
+            self.world = build_world(config)
+            self.tree = tree_factory().fork() if tree_factory is not None else None
+            if setup is not None:
+                setup(self.world)
+        for event in EVENTS:
+            self.world.updater.register_callback(event, functools.partial(self._dispatch, event))
+
+    def register_callback(self, event: str, callback: typing.Callable) -> None:
+        """注册可以记录操作的回调函数, 参数与世界的回调函数相同."""
+        if event not in EVENTS:
+            msg = f"不支持记录的事件: {event}"
+            raise ValueError(msg)
+        self._callbacks.setdefault(event, []).append(callback)
+
+    def _dispatch(self, event: str, world: World, *args: typing.Any, **kwargs: typing.Any) -> None:
+        occurrence = self._counter.next(event, world.time)
+        callbacks = self._callbacks.get(event)
+        if not callbacks:
+            return
+        self._event = (event, occurrence)
+        try:
+            for callback in callbacks:
+                callback(world, *args, **kwargs)
+        finally:
+            self._event = None
+
+    def perform(self, kind: str, *args: typing.Any) -> None:
+        """执行并记录一个操作, 参数必须可以写入JSON."""
+        if self._updating and self._event is None:
+            msg = "更新过程中只能在 Recorder.register_callback 注册的回调中记录操作"
+            raise RuntimeError(msg)
+        event, occurrence = self._event or (None, 0)
+        args = _encode(list(args))
+        with self._random.active():
+            ACTIONS[kind](self.world, self.tree, *args)
+        self.log.actions.append((self.world.time, event, occurrence, kind, args))
+
+    def evolve_symptom(self, name: str) -> None:
+        """进化症状."""
+        self.perform("evolve", name)
+
+    def lock_symptom(self, name: str) -> None:
+        """锁定症状."""
+        self.perform("lock", name)
+
+    def unlock_symptom(self, name: str) -> None:
+        """解锁症状."""
+        self.perform("unlock", name)
+
+    def add_gene_code(self, gene_code: GeneCode) -> None:
+        """添加基因代码."""
+        self.perform("add_gene_code", gene_code)
+
+    def remove_gene_code(self, index: int) -> None:
+        """移除基因代码."""
+        self.perform("remove_gene_code", index)
+
+    def set(self, target: str, key: str, value: typing.Any) -> None:
+        """修改属性, target 为"world"、"disease"或"country:<序号>"."""
+        self.perform("set", target, key, value)
+
+    def update(self) -> None:
+        """模拟每天更新."""
+        self._updating = True
+        try:
+            with self._random.active():
+                self.world.update()
+        finally:
+            self._updating = False
+        self.log.length = self.world.time
+
+
+class _Keyframe:
+    def __init__(self, player: Replayer) -> None:
+        self.time = player.world.time
+        self.world = player.world.fork()
+        self.tree = player.tree.fork() if player.tree is not None else None
+        self.rng_state = rate.rng.getstate()  # 在 Replayer 的随机数状态换入时创建
+        self.action_index = player.action_index
+
+
+class Replayer:
+    """根据回放记录重新模拟, 可以跳转到任意一天.
+
+    tree_factory 用于创建与记录时相同的症状树, setup 与记录时相同.
+    """
+
+    def __init__(
+        self,
+        log: ReplayLog,
+        tree_factory: typing.Callable[[], SymptomsTree] | None = None,
+        setup: typing.Callable[[World], None] | None = None,
+        keyframe_interval: int = 100,  # 每隔多少天保存一个关键帧
+    ) -> None:
+        self.log = log
+        self.keyframe_interval = keyframe_interval
+        self._random = _RandomState(log.seed)
+        self._counter = _EventCounter()
+        self.action_index = 0  # 下一个要执行的操作
+        with self._random.active():
+            self.world = build_world(log.config)
+            self.tree = tree_factory().fork() if tree_factory is not None else None
+            if setup is not None:
+                setup(self.world)
+            for event in EVENTS:
+                self.world.updater.register_callback(
+                    event,
+                    functools.partial(self._on_event, event),
+                )
+            self._apply_actions(None, 0)
+            self.keyframes = [_Keyframe(self)]
+
+    def _apply_actions(self, event: str | None, occurrence: int) -> None:
+        actions = self.log.actions
+        while self.action_index < len(actions):
+            tick, action_event, action_occurrence, kind, args = actions[self.action_index]
+            if event is None:
+                if action_event is not None or tick > self.world.time:
+                    break
+            elif (tick, action_event, action_occurrence) != (self.world.time, event, occurrence):
+                break
+            ACTIONS[kind](self.world, self.tree, *args)
+            self.action_index += 1
+
+    def _on_event(
+        self,
+        event: str,
+        world: World,
+        *_args: typing.Any,
+        **_kwargs: typing.Any,
+    ) -> None:
+        self._apply_actions(event, self._counter.next(event, world.time))
+
+    def step(self) -> None:
+        """向前模拟一天."""
+        with self._random.active():
+            self.world.update()
+            self._apply_actions(None, 0)
+            if (
+                self.world.time % self.keyframe_interval == 0
+                and self.world.time > self.keyframes[-1].time
+            ):
+                self.keyframes.append(_Keyframe(self))
+
+    def seek(self, tick: int) -> World:
+        """跳转到第tick天, 返回该天结束(包括当天记录的操作)时的世界."""
+        index = bisect.bisect_right([keyframe.time for keyframe in self.keyframes], tick) - 1
+        keyframe = self.keyframes[index]
+        if not keyframe.time <= self.world.time <= tick:
+            self.world = keyframe.world.fork()
+            self.tree = keyframe.tree.fork() if keyframe.tree is not None else None
+            self._random.state = keyframe.rng_state
+            self._counter = _EventCounter()
+            self.action_index = keyframe.action_index
+        while self.world.time < tick:
+            self.step()
+        return self.world
+
+    def run(self) -> World:
+        """模拟到记录的最后一天."""
+        return self.seek(self.log.length)
@@ -0,0 +1,115 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于世界的定时事件调度.
+
+事件保存在按触发天数排序的堆中, 每天只取出到期的事件, 插入的时间复杂度为O(log n).
+取消只记录编号, 被取消的事件在到达堆顶时丢弃, 时间复杂度为O(1).
+"""
+
+from __future__ import annotations
+
+import heapq
+import typing
+
+from .gene_codes import GeneCode, LongTermGeneCode
+
+if typing.TYPE_CHECKING:
+    from .world import World
+
+
+def _activate_gene_code(gene_code: GeneCode | LongTermGeneCode) -> typing.Callable:
+    def activate(world: World) -> None:
+        disease = world.disease
+        disease.gene_codes.append(gene_code)
+        if isinstance(gene_code, GeneCode):
+            gene_code.apply_effects(disease)  # 一次性基因代码立即生效
+
+    return activate
+
+
+def _expire_gene_code(gene_code: LongTermGeneCode) -> typing.Callable:
+    def expire(world: World) -> None:
+        disease = world.disease
+        if gene_code in disease.gene_codes:
+            disease.gene_codes.remove(gene_code)
+
+    return expire
+
+
+class Scheduler:
+    """定时事件调度器, 事件在到期当天世界更新开始时触发."""
+
+    def __init__(self) -> None:
+        self._queue: list[tuple[int, int, typing.Callable, int | None]] = []
+        self._next_id = 0
+        self._live: set[int] = set()  # 仍在队列中且没有被取消的事件
+        self._cancelled: set[int] = set()  # 已取消但仍在队列中的事件
+
+    def __len__(self) -> int:
+        return len(self._live)
+
+    def schedule(
+        self,
+        tick: int,  # 触发的天数
+        action: typing.Callable[[World], None],  # 事件, 参数为世界
+        period: int | None = None,  # 周期, 为None时只触发一次
+    ) -> int:
+        """添加事件, 返回事件编号."""
+        if period is not None and period < 1:
+            msg = "事件周期必须至少为1天"
+            raise ValueError(msg)
+        event_id = self._next_id
+        self._next_id += 1
+        self._live.add(event_id)
+        heapq.heappush(self._queue, (tick, event_id, action, period))
+        return event_id
+
+    def cancel(self, event_id: int) -> None:
+        """取消事件, 周期事件之后也不会再触发."""
+        if event_id in self._live:
+            self._live.discard(event_id)
+            self._cancelled.add(event_id)
+
+    def schedule_gene_code(
+        self,
+        tick: int,  # 激活的天数
+        gene_code: GeneCode | LongTermGeneCode,
+        duration: int | None = None,  # 持续天数, 只支持长期效用基因代码
+    ) -> int:
+        """在指定天数激活基因代码, 可选在若干天后失效, 返回激活事件的编号."""
+        if duration is not None and not isinstance(gene_code, LongTermGeneCode):
+            msg = "只有长期效用基因代码可以失效"
+            raise ValueError(msg)
+        event_id = self.schedule(tick, _activate_gene_code(gene_code))
+        if duration is not None:
+            self.schedule(tick + duration, _expire_gene_code(gene_code))
+        return event_id
+
+    def next_tick(self) -> int | None:
+        """下一个事件触发的天数."""
+        while self._queue and self._queue[0][1] in self._cancelled:
+            self._cancelled.discard(heapq.heappop(self._queue)[1])
+        return self._queue[0][0] if self._queue else None
+
+    def run_due(self, world: World) -> None:
+        """触发所有在世界当前天数或之前到期的事件.
+
+        错过的周期事件只触发一次, 下一次触发顺延到当前天数之后的第一个周期.
+        """
+        while (tick := self.next_tick()) is not None and tick <= world.time:
+            _, event_id, action, period = heapq.heappop(self._queue)
+            if period is not None:
+                next_tick = tick + period * ((world.time - tick) // period + 1)
+                heapq.heappush(self._queue, (next_tick, event_id, action, period))
+            else:
+                self._live.discard(event_id)
+            action(world)
+
+    def fork(self) -> Scheduler:
+        """复制调度器, 用于分叉世界."""
+        scheduler = object.__new__(Scheduler)
+        scheduler._queue = list(self._queue)
+        scheduler._next_id = self._next_id
+        scheduler._live = set(self._live)
+        scheduler._cancelled = set(self._cancelled)
+        return scheduler
@@ -0,0 +1,404 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于多进程分片执行世界的每日更新.
+
+国家的感染/死亡人数与国家内传播性/致死性直接保存在 `multiprocessing.shared_memory` 缓冲区中,
+执行期间 `Country` 的这些属性读写的就是缓冲区, 主进程每天不需要复制国家状态.
+每个工作进程只负责一段连续的国家, 进程之间只传递病原体的少量参数和各分片的总感染/死亡人数.
+每个国家的计算与 `Updater` 完全一致, 且只依赖该国家自身的数据, 因此结果与工作进程数量无关.
+目前国家之间没有跨国传播, 所以分片之间不需要交换感染数据.
+"""
+
+from __future__ import annotations
+
+import array
+import contextlib
+import functools
+import multiprocessing
+import typing
+import weakref
+from multiprocessing import shared_memory
+
+from .world import Updater
+
+if typing.TYPE_CHECKING:
+    from multiprocessing.connection import Connection
+
+    from .world import Country, World
+
+ENVIRONMENTS = ("Hot", "Cold", "Humid", "Arid")  # 环境条件的固定顺序
+
+# 整数列
+POPULATION = 0  # 人口规模
+INFECTED = 1  # 已感染人数
+DEATHED = 2  # 死亡人数
+ENVIRONMENT = 3  # 环境条件位掩码
+INT_COLUMNS = 4
+
+# 浮点数列
+DENSITY = 0  # 人口密度
+WEALTH = 1  # 财富
+GLOBAL_IMPORTANCE = 2  # 全球重要性因素
+INTERNAL_INFECTIVITY = 3  # 国家内传播性
+INTERNAL_LETHALITY = 4  # 国家内致死性
+FLOAT_COLUMNS = 5
+
+HEAL_RATE = 0.25  # 每天治愈25%的感染者
+
+
+def _spread(
+    ints: memoryview,
+    floats: memoryview,
+    count: int,
+    start: int,
+    stop: int,
+    infectivity: float,
+    environment_values: tuple[float, ...],
+    lethality: float,
+) -> tuple[int, int]:
+    """在分片上更新感染与死亡人数, 返回分片的总感染人数和总死亡人数."""
+    total_infections = 0
+    total_deaths = 0
+    for index in range(start, stop):
+        population = ints[POPULATION * count + index]
+        infected = ints[INFECTED * count + index]
+        deathed = ints[DEATHED * count + index]
+        environment = ints[ENVIRONMENT * count + index]
+
+        # 感染, 与 Updater.update_infection 相同
+        infection_rate = infectivity * floats[INTERNAL_INFECTIVITY * count + index]
+        for bit, value in enumerate(environment_values):
+            if environment >> bit & 1:
+                infection_rate *= 1 + value
+        infections = round(infection_rate * population * floats[DENSITY * count + index])
+        if infections > 0:
+            infected = min(infected + infections, population)
+            if infected + deathed > population:
+                infected = population - deathed
+
+        # 死亡, 与 Updater.update_death 相同
+        death_rate = lethality * floats[INTERNAL_LETHALITY * count + index]
+        death_rate *= 1 - floats[WEALTH * count + index] * 0.01
+        death_rate *= 1 - floats[GLOBAL_IMPORTANCE * count + index] * 0.01
+        deaths = round(death_rate * infected)
+        if deaths < 1 and infected > 0:
+            deaths = infected
+        infected = max(infected - deaths, 0)
+        deathed = min(deathed + deaths, population)
+        if infected + deathed > population:
+            infected = population - deathed
+
+        ints[INFECTED * count + index] = infected
+        ints[DEATHED * count + index] = deathed
+        total_infections += infected
+        total_deaths += deathed
+    return total_infections, total_deaths
+
+
+def _heal(ints: memoryview, count: int, start: int, stop: int) -> int:
+    """在分片上更新治愈人数, 返回分片的总感染人数."""
+    total_infections = 0
+    for index in range(start, stop):
+        infected = ints[INFECTED * count + index]
+        healed = round(infected * HEAL_RATE)
+        if healed < 1 and infected > 0:
+            healed = infected
+        infected = max(infected - healed, 0)
+        ints[INFECTED * count + index] = infected
+        total_infections += infected
+    return total_infections
+
+
+def _worker(
+    ints_name: str,
+    floats_name: str,
+    count: int,
+    start: int,
+    stop: int,
+    conn: Connection,
+) -> None:
+    """工作进程主循环, 收到None时退出."""
+    ints_memory = shared_memory.SharedMemory(name=ints_name)
+    floats_memory = shared_memory.SharedMemory(name=floats_name)
+    ints = ints_memory.buf.cast("q")
+    floats = floats_memory.buf.cast("d")
+    try:
+        while (command := conn.recv()) is not None:
+            stage, *args = command
+            if stage == "spread":
+                conn.send(_spread(ints, floats, count, start, stop, *args))
+            elif stage == "heal":
+                conn.send(_heal(ints, count, start, stop))
+    finally:
+        ints.release()
+        floats.release()
+        ints_memory.close()
+        floats_memory.close()
+        conn.close()
+
+
+class _Column:
+    """将国家属性映射到共享内存中的一列."""
+
+    def __init__(self, column: int, *, floats: bool = False) -> None:
+        self.floats = floats
+        self.column = column
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+
+    def __get__(self, country: Country | None, owner: type | None = None) -> typing.Any:
+        if country is None:
+            return self
+        executor, index = country._shard
+        view = executor._floats if self.floats else executor._ints
+        return view[self.column * executor.count + index]
+
+    def __set__(self, country: Country, value: float) -> None:
+        executor, index = country._shard
+        view = executor._floats if self.floats else executor._ints
+        view[self.column * executor.count + index] = value
+
+
+SHARED_ATTRIBUTES = {
+    "infected_population": _Column(INFECTED),
+    "deathed_population": _Column(DEATHED),
+    "internal_infectivity": _Column(INTERNAL_INFECTIVITY, floats=True),
+    "internal_lethality": _Column(INTERNAL_LETHALITY, floats=True),
+}
+
+
+def _copy_country(country: Country) -> Country:
+    """复制为普通国家对象, 不再与共享内存关联."""
+    plain = object.__new__(type(country).__mro__[1])
+    plain.__dict__.update(country.__dict__)
+    del plain._shard
+    if isinstance(plain.environment, dict):
+        plain.environment = dict(plain.environment)
+    for name in SHARED_ATTRIBUTES:
+        plain.__dict__[name] = getattr(country, name)
+    return plain
+
+
+@functools.cache
+def _shared_class(cls: type[Country]) -> type[Country]:
+    """生成状态保存在共享内存中的国家类型."""
+    return type(
+        cls.__name__,
+        (cls,),
+        {
+            **SHARED_ATTRIBUTES,
+            "_detach_on_fork": True,
+            "__copy__": _copy_country,
+            "__module__": cls.__module__,
+        },
+    )
+
+
+def _check_updater(world: World) -> None:
+    """分片执行只实现 Updater 的计算, 其他更新器(如微观模拟)的结果会被忽略."""
+    if type(world.updater) is not Updater:
+        msg = f"分片执行不支持 {type(world.updater).__name__}, 只支持 Updater"
+        raise TypeError(msg)
+
+
+def _release(
+    memories: list[shared_memory.SharedMemory],
+    views: list[memoryview],
+    processes: list[multiprocessing.Process],
+    connections: list[Connection],
+) -> None:
+    """结束工作进程并释放共享内存, 可以重复调用."""
+    for conn in connections:
+        with contextlib.suppress(OSError):
+            conn.send(None)
+    for process in processes:
+        process.join()
+    for conn in connections:
+        conn.close()
+    for view in views:
+        view.release()
+    for memory in memories:
+        memory.close()
+        memory.unlink()
+    connections.clear()
+    processes.clear()
+    views.clear()
+    memories.clear()
+
+
+class ShardedExecutor:
+    """将国家分片到多个工作进程中执行世界的每日更新.
+
+    执行期间国家的感染/死亡人数与国家内传播性/致死性保存在共享内存中, close 后写回国家对象.
+    国家的其他参数(人口、密度、财富等)被修改后需要调用 refresh.
+    """
+
+    def __init__(self, world: World, workers: int | None = None) -> None:
+        _check_updater(world)
+        self.world = world
+        self.count = len(world.readonly_countries)
+        workers = workers or multiprocessing.cpu_count()
+        workers = max(1, min(workers, self.count))
+        self.bounds = [self.count * shard // workers for shard in range(workers + 1)]
+
+        self._memories: list[shared_memory.SharedMemory] = []
+        self._views: list[memoryview] = []
+        self._processes: list[multiprocessing.Process] = []
+        self._connections: list[Connection] = []
+        self._bound: list[tuple[Country, type[Country]]] = []  # (国家, 原来的类型)
+        # 即使没有调用 close, 共享内存也会在对象被回收或解释器退出时释放
+        self._finalizer = weakref.finalize(
+            self,
+            _release,
+            self._memories,
+            self._views,
+            self._processes,
+            self._connections,
+        )
+        try:
+            ints_memory = shared_memory.SharedMemory(
+                create=True,
+                size=max(1, INT_COLUMNS * self.count) * 8,
+            )
+            self._memories.append(ints_memory)
+            floats_memory = shared_memory.SharedMemory(
+                create=True,
+                size=max(1, FLOAT_COLUMNS * self.count) * 8,
+            )
+            self._memories.append(floats_memory)
+            self._ints = ints_memory.buf.cast("q")
+            self._views.append(self._ints)
+            self._floats = floats_memory.buf.cast("d")
+            self._views.append(self._floats)
+            self.refresh()
+            self._bind()
+
+            for start, stop in zip(self.bounds, self.bounds[1:], strict=False):
+                parent_conn, child_conn = multiprocessing.Pipe()
+                self._connections.append(parent_conn)
+                process = multiprocessing.Process(
+                    target=_worker,
+                    args=(
+                        ints_memory.name,
+                        floats_memory.name,
+                        self.count,
+                        start,
+                        stop,
+                        child_conn,
+                    ),
+                    daemon=True,
+                )
+                process.start()
+                child_conn.close()
+                self._processes.append(process)
+        except BaseException:
+            self.close()
+            raise
+
+    def __enter__(self) -> typing.Self:
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def _column(self, view: memoryview, column: int) -> memoryview:
+        return view[column * self.count : (column + 1) * self.count]
+
+    def _bind(self) -> None:
+        """将国家的可变状态移入共享内存, 之后国家的这些属性直接读写共享内存."""
+        for index, country in enumerate(self.world.countries):
+            cls = type(country)
+            values = {name: country.__dict__.pop(name) for name in SHARED_ATTRIBUTES}
+            country.__class__ = _shared_class(cls)
+            country._shard = (self, index)
+            self._bound.append((country, cls))
+            for name, value in values.items():
+                setattr(country, name, value)
+
+    def _unbind(self) -> None:
+        """将共享内存中的状态写回国家对象."""
+        for country, cls in self._bound:
+            values = {name: getattr(country, name) for name in SHARED_ATTRIBUTES}
+            country.__class__ = cls
+            del country._shard
+            country.__dict__.update(values)
+        self._bound.clear()
+
+    def refresh(self) -> None:
+        """将国家的静态参数写入共享内存, 国家的人口、密度、财富等被修改后需要调用."""
+        countries = self.world.readonly_countries
+        masks = []
+        for country in countries:
+            mask = 0
+            for bit, key in enumerate(ENVIRONMENTS):
+                if country.environment.get(key):
+                    mask |= 1 << bit
+            masks.append(mask)
+        self._column(self._ints, POPULATION)[:] = array.array(
+            "q",
+            [country.population for country in countries],
+        )
+        self._column(self._ints, ENVIRONMENT)[:] = array.array("q", masks)
+        self._column(self._floats, DENSITY)[:] = array.array(
+            "d",
+            [country.density for country in countries],
+        )
+        self._column(self._floats, WEALTH)[:] = array.array(
+            "d",
+            [country.wealth for country in countries],
+        )
+        self._column(self._floats, GLOBAL_IMPORTANCE)[:] = array.array(
+            "d",
+            [country.global_importance for country in countries],
+        )
+
+    def _broadcast(self, command: tuple) -> list:
+        for conn in self._connections:
+            conn.send(command)
+        return [conn.recv() for conn in self._connections]
+
+    def update_infection(self) -> None:
+        """分片更新每天感染与死亡人数."""
+        disease = self.world.readonly_disease
+        results = self._broadcast(
+            (
+                "spread",
+                disease.infectivity.value,
+                tuple(disease.environmental_conditions[key].value for key in ENVIRONMENTS),
+                disease.lethality.value,
+            ),
+        )
+        total_deaths = sum(deaths for _, deaths in results)
+        if self.world.total_population - total_deaths <= 0:
+            self.world.updater._call_callbacks("full_deathed")
+            self.world.full_deathed = True
+
+    def update_death(self) -> None:
+        """死亡人数已在 update_infection 中与感染人数一起更新."""
+
+    def update_cure(self) -> None:
+        """更新解药研发进度, 与 Updater 相同."""
+        self.world.updater.update_cure()
+
+    def update_by_genecode(self) -> None:
+        """根据基因代码更新, 与 Updater 相同."""
+        self.world.updater.update_by_genecode()
+
+    def update_healing(self) -> None:
+        """分片更新每天治愈人数."""
+        if self.world.cure_money < self.world.cure_required_money:
+            return
+        total_infections = sum(self._broadcast(("heal",)))
+        if total_infections <= 0:
+            self.world.updater._call_callbacks("full_healthed")
+
+    def update(self) -> None:
+        """模拟每天更新, 阶段顺序由 World.advance 决定."""
+        _check_updater(self.world)
+        self.world.advance(self)
+
+    def close(self) -> None:
+        """将状态写回国家对象, 结束所有工作进程并释放共享内存."""
+        self._unbind()
+        self._finalizer()
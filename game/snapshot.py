@@ -0,0 +1,103 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于世界状态的不可变快照.
+
+世界在每天更新结束时生成新的快照, 并通过一次引用赋值发布, 其他线程读取 `World.snapshot`
+即可得到最新且一致的状态, 不需要加锁, 也不会被之后的更新修改.
+快照包括世界、各国家与病原体的数值状态, 不包括回调、定时事件与基因代码对象.
+"""
+
+from __future__ import annotations
+
+import types
+import typing
+
+if typing.TYPE_CHECKING:
+    from .world import World
+
+
+class CountrySnapshot(typing.NamedTuple):
+    """国家状态快照."""
+
+    name: str
+    population: int
+    infected_population: int
+    deathed_population: int
+
+
+class DiseaseSnapshot(typing.NamedTuple):
+    """病原体状态快照, 百分比只保存数值."""
+
+    name: str
+    infectivity: float
+    severity: float
+    lethality: float
+    mutation_multiplier: float
+    cure_resistance: float
+    base_cross_country_transmission: typing.Mapping[str, int]
+    base_environmental_effectivity: typing.Mapping[str, int]
+    environmental_conditions: typing.Mapping[str, float]
+    gene_codes: int  # 生效的基因代码数量
+
+
+class WorldSnapshot(typing.NamedTuple):
+    """世界状态快照."""
+
+    epoch: int  # 快照版本, 每次发布加一
+    time: int
+    disease_detected: bool
+    cure_money: float
+    cure_required_money: int
+    cure_importance: float
+    cure_investment: int
+    full_deathed: bool
+    cure_finished: bool
+    total_population: int
+    total_infections: int
+    total_deaths: int
+    countries: tuple[CountrySnapshot, ...]
+    disease: DiseaseSnapshot
+
+
+def take_snapshot(world: World, epoch: int = 0) -> WorldSnapshot:
+    """生成世界状态快照."""
+    countries = tuple(
+        CountrySnapshot(
+            country.name,
+            country.population,
+            country.infected_population,
+            country.deathed_population,
+        )
+        for country in world.readonly_countries
+    )
+    disease = world.readonly_disease
+    disease_snapshot = DiseaseSnapshot(
+        disease.name,
+        disease.infectivity.value,
+        disease.severity.value,
+        disease.lethality.value,
+        disease.mutation_multiplier.value,
+        disease.cure_resistance.value,
+        types.MappingProxyType(dict(disease.base_cross_country_transmission)),
+        types.MappingProxyType(dict(disease.base_environmental_effectivity)),
+        types.MappingProxyType(
+            {key: value.value for key, value in disease.environmental_conditions.items()},
+        ),
+        len(disease.gene_codes),
+    )
+    return WorldSnapshot(
+        epoch,
+        world.time,
+        world.disease_detected,
+        world.cure_money,
+        world.cure_required_money,
+        world.cure_importance,
+        world.cure_investment,
+        world.full_deathed,
+        world.cure_finished,
+        world.total_population,
+        sum(country.infected_population for country in countries),
+        sum(country.deathed_population for country in countries),
+        countries,
+        disease_snapshot,
+    )
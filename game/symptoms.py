@@ -5,6 +5,7 @@
 
 from __future__ import annotations
 
+import copy
 import typing
 
 if typing.TYPE_CHECKING:
@@ -22,6 +23,12 @@ class SymptomNode:
         self.children.append(child_node)
         return child_node
 
+    def fork(self, parent: SymptomNode | None = None) -> SymptomNode:
+        """复制节点及其子树, 症状的进化状态与原节点互不影响."""
+        node = SymptomNode(copy.copy(self.symptom), parent)
+        node.children = [child.fork(node) for child in self.children]
+        return node
+
     def find_symptom(self, symptom_name: str) -> SymptomNode:
         if self.symptom.name == symptom_name:
             return self
@@ -44,6 +51,12 @@ class SymptomsTree:
     def __init__(self):
         self.roots = []
 
+    def fork(self) -> SymptomsTree:
+        """复制症状树, 用于分叉世界的策略搜索."""
+        tree = SymptomsTree()
+        tree.roots = [root.fork() for root in self.roots]
+        return tree
+
     def add_root(self, root_symptom: Symptoms):
         root_node = SymptomNode(root_symptom)
         self.roots.append(root_node)
@@ -88,6 +101,12 @@ class Symptoms:
             cls._instances[key] = instance
         return cls._instances[key]
 
+    def __copy__(self) -> typing.Self:
+        # 绕过 __new__ 的实例缓存
+        symptom = object.__new__(type(self))
+        symptom.__dict__.update(self.__dict__)
+        return symptom
+
     def __init__(
         self,
         name: str,
@@ -130,6 +149,32 @@ class Symptoms:
             self.evolved = False  # 已进化?
             self.locked = False  # 初始化为未锁定
 
+    def apply_effects(self, disease: Disease):
+        """应用症状的效果到疾病上."""
+        disease.infectivity.value += self.infectivity
+        disease.severity.value += self.severity
+        disease.lethality.value += self.lethality
+        disease.mutation_multiplier.value += self.mutation_multiplier
+        disease.cure_resistance.value += self.cure_resistance
+
+        # 更新跨国传播能力
+        for key in self.base_cross_country_transmission:
+            disease.base_cross_country_transmission[
+                key
+            ] += self.base_cross_country_transmission[key]
+
+        # 更新环境适应性
+        for key in self.base_environmental_effectivity:
+            disease.base_environmental_effectivity[
+                key
+            ] += self.base_environmental_effectivity[key]
+
+        # 更新环境条件
+        for key in self.environmental_conditions:
+            disease.environmental_conditions[
+                key
+            ].value += self.environmental_conditions[key]
+
     def lock(self):
         """锁定症状, 阻止其进化."""
         self.locked = True
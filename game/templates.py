@@ -0,0 +1,126 @@
+"""PythonGenePlague: 一个受到Plague Inc.游戏启发制作小Python游戏.
+
+该代码用于定义冻结的世界参数模板.
+
+模板在创建时合并默认参数并构造一次原型世界(校验国家环境条件、应用基因代码),
+之后每次实例化只分叉原型, 国家与病原体在被写入前与原型共享(写时复制),
+不需要重新构造或防御性地深复制参数.
+基因代码在冻结时被复制且其参数字典只读, 所有实例共享这些基因代码对象, 不应修改它们的属性.
+"""
+
+from __future__ import annotations
+
+import copy
+import types
+import typing
+
+from .diseases import Disease
+from .gene_codes import GeneCode, LongTermGeneCode
+from .params_factory import ParamsFactory
+from .rate import PctBase
+from .world import Country, World
+
+
+def _freeze(value: typing.Any) -> typing.Any:
+    """复制参数并转换为只读结构."""
+    if isinstance(value, PctBase):
+        return value.copy()
+    if isinstance(value, GeneCode | LongTermGeneCode):
+        gene_code = copy.copy(value)
+        gene_code.__dict__.update({key: _freeze(item) for key, item in value.__dict__.items()})
+        return gene_code
+    if isinstance(value, dict | types.MappingProxyType):
+        return types.MappingProxyType({key: _freeze(item) for key, item in value.items()})
+    if isinstance(value, list | tuple):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _thaw(value: typing.Any) -> typing.Any:
+    """由只读参数创建可以传给构造函数的新对象."""
+    if isinstance(value, PctBase):
+        return value.copy()
+    if isinstance(value, types.MappingProxyType):
+        return {key: _thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(item) for item in value]
+    return value
+
+
+class WorldTemplate:
+    """冻结的世界参数模板, 用于快速创建大量世界."""
+
+    def __init__(
+        self,
+        disease_params: typing.Mapping,  # 病原体参数, 未指定的使用默认值
+        countries_params: list[typing.Mapping],  # 各国家参数, 未指定的使用默认值
+        world_params: typing.Mapping | None = None,  # 世界参数, 未指定的使用默认值
+    ) -> None:
+        self.disease_params = _freeze(
+            {**ParamsFactory.get_default_disease_params(), **disease_params},
+        )
+        self.countries_params = tuple(
+            _freeze({**ParamsFactory.get_default_country_params(), **params})
+            for params in countries_params
+        )
+        self.world_params = _freeze(
+            {**ParamsFactory.get_default_world_params(), **(world_params or {})},
+        )
+        self._prototype = World(
+            self._build_disease(),
+            [self._build_country(params) for params in self.countries_params],
+            **_thaw(self.world_params),
+        )
+
+    def _build_disease(self) -> Disease:
+        return Disease(**_thaw(self.disease_params))
+
+    @staticmethod
+    def _build_country(params: typing.Mapping) -> Country:
+        country = Country(**_thaw(params))
+        country.environment = types.MappingProxyType(country.environment)  # 实例之间共享, 只读
+        return country
+
+    def instantiate(self) -> World:
+        """创建世界, 与模板共享未修改的国家与病原体."""
+        return self._prototype.fork(callbacks=False)
+
+    def override(
+        self,
+        disease: typing.Mapping | None = None,  # 病原体参数增量
+        countries: typing.Mapping[int, typing.Mapping] | None = None,  # 国家序号 -> 参数增量
+        world: typing.Mapping | None = None,  # 世界参数增量
+    ) -> WorldTemplate:
+        """以增量参数创建新模板, 只重新构造被修改的部分, 其余与原模板共享."""
+        template = object.__new__(WorldTemplate)
+        template.disease_params = self.disease_params
+        template.countries_params = self.countries_params
+        template.world_params = self.world_params
+        prototype = self._prototype.fork(callbacks=False)
+
+        if disease:
+            template.disease_params = _freeze({**self.disease_params, **disease})
+            prototype.disease = template._build_disease()
+
+        if countries:
+            countries_params = list(self.countries_params)
+            for index, params in countries.items():
+                countries_params[index] = _freeze({**countries_params[index], **params})
+                prototype._shared_countries.discard(id(prototype._countries[index]))
+                prototype._countries[index] = self._build_country(countries_params[index])
+            template.countries_params = tuple(countries_params)
+            prototype.total_population = sum(
+                country.population for country in prototype.readonly_countries
+            )
+
+        if world:
+            unknown = world.keys() - self.world_params.keys()
+            if unknown:
+                msg = f"未知的世界参数: {', '.join(sorted(unknown))}"
+                raise TypeError(msg)
+            template.world_params = _freeze({**self.world_params, **world})
+            for key, value in world.items():
+                setattr(prototype, key, _thaw(_freeze(value)))
+
+        template._prototype = prototype
+        return template
@@ -5,25 +5,32 @@
 
 from __future__ import annotations
 
+import copy
 import typing
+import weakref
 
 from .gene_codes import LongTermGeneCode
 from .rate import random_boolean
+from .scheduler import Scheduler
+from .snapshot import WorldSnapshot, take_snapshot
 
 if typing.TYPE_CHECKING:
     from .diseases import Disease
+    from .sharding import ShardedExecutor
 
 
 class World:
     def __init__(
         self,
         disease: Disease,  # 病原体
-        countries: list[World.Country],  # 国家
+        countries: list[Country],  # 国家
         cure_required_money: int = 3000000,  # 解药研发所需总资金
         cure_importance: float = 0,  # 解药研发重视程度增量
         cure_investment: int = 0,  # 解药已有投入
     ) -> None:
-        self.updater = World.Updater(self)
+        self._shared_countries: set[int] = set()  # 与其他分叉世界共享的国家(写时复制)
+        self._disease_shared = False  # 病原体是否与其他分叉世界共享
+        self.updater = Updater(self)
         self.disease = disease  # 病原体
         self.countries = countries  # 国家
         self.disease_detected = False  # 瘟疫是否已被世界发现
@@ -35,28 +42,133 @@ class World:
         self.cure_investment = cure_investment  # 解药已有投入
         self.full_deathed = False  # 是否全部死去
         self.cure_finished = False  # 解药是否开发完成
+        self.scheduler = Scheduler()  # 定时事件
+        self.publish_snapshots = False  # 是否在每天更新结束时发布快照
+        self.snapshot: WorldSnapshot | None = None  # 最新发布的快照, 可在其他线程中无锁读取
+
+    @property
+    def countries(self) -> list[Country]:
+        """国家列表, 与其他分叉世界共享的国家在访问时被复制, 返回的国家可以直接修改.
+
+        分叉之后原世界也会复制共享的国家, 分叉前取得的国家对象不再属于该世界, 需要重新获取.
+        """
+        if self._shared_countries:
+            shared = self._shared_countries
+            countries = self._countries
+            for index, country in enumerate(countries):
+                if id(country) in shared:
+                    countries[index] = copy.copy(country)
+            shared.clear()
+        return self._countries
+
+    @countries.setter
+    def countries(self, countries: list[Country]) -> None:
+        self._countries = countries
+        self._shared_countries = set()
+
+    @property
+    def disease(self) -> Disease:
+        """病原体, 与其他分叉世界共享时在访问时被复制, 返回的病原体可以直接修改.
+
+        与 countries 相同, 分叉前取得的病原体对象不再属于该世界, 需要重新获取.
+        """
+        if self._disease_shared:
+            self._disease = self._disease.copy()
+            self._disease_shared = False
+        return self._disease
+
+    @disease.setter
+    def disease(self, disease: Disease) -> None:
+        self._disease = disease
+        self._disease_shared = False
+
+    @property
+    def readonly_countries(self) -> list[Country]:
+        """只读的国家列表, 不会复制共享的国家, 不得通过它修改国家."""
+        return self._countries
+
+    @property
+    def readonly_disease(self) -> Disease:
+        """只读的病原体, 不会复制共享的病原体, 不得通过它修改病原体."""
+        return self._disease
 
     def total_infections(self) -> int:
         """统计总感染人数."""
-        return sum(country.infected_population for country in self.countries)
+        return sum(country.infected_population for country in self._countries)
 
     def total_deaths(self) -> int:
         """统计总死亡人数."""
-        return sum(country.deathed_population for country in self.countries)
+        return sum(country.deathed_population for country in self._countries)
+
+    def fork(self, callbacks: bool = True) -> World:
+        """分叉世界, 国家与病原体在被写入前与原世界共享.
+
+        通过 countries / disease 访问时才会复制, 回调、定时事件与策略都可以直接修改它们.
+        原世界与分叉世界是对称的: 原世界之后的访问同样得到副本, 分叉前从原世界取得的国家与病原体
+        仍然与分叉世界共享, 不能再用来修改原世界, 也不应被修改.
+        """
+        world = object.__new__(World)
+        world.__dict__.update(self.__dict__)
+        # 与外部资源绑定的国家(如共享内存)不能共享, 分叉世界立即得到普通的副本
+        world._countries = [
+            copy.copy(country) if country._detach_on_fork else country
+            for country in self._countries
+        ]
+        shared = {id(country) for country in self._countries if not country._detach_on_fork}
+        self._shared_countries = shared
+        world._shared_countries = set(shared)
+        self._disease_shared = world._disease_shared = True
+        world.updater = self.updater.fork(world, callbacks)
+        world.scheduler = self.scheduler.fork()
+        world.publish_snapshots = False  # 分叉世界(如策略搜索)默认不发布快照
+        world.snapshot = None
+        return world
+
+    def rollout(
+        self,
+        days: int,
+        policy: typing.Callable[[World], None] | None = None,
+        callbacks: bool = False,
+    ) -> World:
+        """从当前世界分叉并模拟若干天, 返回分叉后的世界, 当前世界不受影响.
+
+        policy 在每天更新前被调用, 用于进化症状或修改基因代码等决策.
+        """
+        world = self.fork(callbacks)
+        for _ in range(days):
+            if world.full_deathed or world.cure_finished:
+                break
+            if policy is not None:
+                policy(world)
+            world.update()
+        return world
 
     @staticmethod
     def __total_populations(countries: list[Country]) -> int:
         return sum(country.population for country in countries)
 
-    def update(self) -> int:
+    def update(self) -> None:
         """模拟每天更新."""
+        self.advance(self.updater)
+
+    def advance(self, stages: Updater | ShardedExecutor) -> None:
+        """按固定顺序模拟一天, 各阶段由stages实现, 回调仍由世界的更新器调用."""
         self.time += 1  # 时间增加一天
-        self.updater.update_infection()  # 更新感染人数
-        self.updater.update_death()  # 更新死亡人数
-        self.updater.update_cure()  # 更新解药研发进度
-        self.updater.update_by_genecode()  # 根据基因代码更新
-        self.updater.update_healing()
+        self.scheduler.run_due(self)  # 触发到期的定时事件
+        stages.update_infection()  # 更新感染人数
+        stages.update_death()  # 更新死亡人数
+        stages.update_cure()  # 更新解药研发进度
+        stages.update_by_genecode()  # 根据基因代码更新
+        stages.update_healing()
         self.updater._call_callbacks("on_update")
+        if self.publish_snapshots:
+            self.publish_snapshot()
+
+    def publish_snapshot(self) -> WorldSnapshot:
+        """生成并发布当前状态的快照."""
+        epoch = 0 if self.snapshot is None else self.snapshot.epoch + 1
+        self.snapshot = take_snapshot(self, epoch)  # 一次引用赋值, 读者总是看到完整的快照
+        return self.snapshot
 
     def print_information(self) -> None:
         """打印世界信息."""
@@ -71,6 +183,8 @@ class World:
 
 
 class Country:
+    _detach_on_fork: typing.ClassVar[bool] = False  # 分叉世界时是否立即复制
+
     def __init__(
         self,
         name: str,  # 国家名称
@@ -101,6 +215,14 @@ class Country:
         self.internal_severity = 1.0  # 国家内严重性
         self.internal_lethality = 1.0  # 国家内致死性
 
+    def __copy__(self) -> typing.Self:
+        # 环境条件字典不共享, 模板中的只读映射可以继续共享
+        country = object.__new__(type(self))
+        country.__dict__.update(self.__dict__)
+        if isinstance(self.environment, dict):
+            country.environment = dict(self.environment)
+        return country
+
     def __validate_environmental_conditions(
         self,
         conditions: dict[str, bool],
@@ -119,10 +241,30 @@ class Updater:
     def __init__(
         self,
         world: World,
-        callbacks: dict[str, list[typing.Callable]] = {},  # 回调函数
+        callbacks: dict[str, list[typing.Callable]] | None = None,  # 回调函数
     ) -> None:
         self.world = world
-        self.callbacks = callbacks
+        self.callbacks = {} if callbacks is None else callbacks
+
+    @property
+    def world(self) -> World:
+        # 弱引用, 避免世界与更新器之间的循环引用, 丢弃的分叉世界可以立即释放
+        return self._world()
+
+    @world.setter
+    def world(self, world: World) -> None:
+        self._world = weakref.ref(world)
+
+    def fork(self, world: World, callbacks: bool = True) -> Updater:
+        """复制更新器并绑定到分叉世界."""
+        updater = copy.copy(self)
+        updater.world = world
+        updater.callbacks = (
+            {event: list(listeners) for event, listeners in self.callbacks.items()}
+            if callbacks
+            else {}
+        )
+        return updater
 
     def register_callback(self, event: str, callback: typing.Callable) -> None:
         """注册回调函数."""
@@ -145,16 +287,14 @@ class Updater:
 
     def update_infection(self) -> None:
         """更新每天感染人数."""
-        for country in self.world.countries:
+        world = self.world
+        disease = world.readonly_disease
+        for country in world.countries:
             # 根据国家的环境数据和病原体的数据来计算感染率
-            infection_rate = (
-                self.world.disease.infectivity.value * country.internal_infectivity
-            )
+            infection_rate = disease.infectivity.value * country.internal_infectivity
             for key, value in country.environment.items():
                 if value:
-                    infection_rate *= (
-                        1 + self.world.disease.environmental_conditions[key].value
-                    )
+                    infection_rate *= 1 + disease.environmental_conditions[key].value
             infections = round(infection_rate * country.population * country.density)
             if infections > 0:
                 country.infected_population += infections
@@ -174,9 +314,11 @@ class Updater:
 
     def update_death(self) -> None:
         """更新每天死亡人数."""
-        for country in self.world.countries:
+        world = self.world
+        disease = world.readonly_disease
+        for country in world.countries:
             # 根据国家的财富、全球重要性等因素和病原体的致命性来计算死亡率
-            death_rate = self.world.disease.lethality.value * country.internal_lethality
+            death_rate = disease.lethality.value * country.internal_lethality
             death_rate *= 1 - country.wealth * 0.01
             death_rate *= 1 - country.global_importance * 0.01
             deaths = round(death_rate * country.infected_population)
@@ -202,55 +344,58 @@ class Updater:
                 country.infected_population = (
                     country.population - country.deathed_population
                 )
-            if self.world.total_population - self.world.total_deaths() <= 0:
+            if world.total_population - world.total_deaths() <= 0:
                 self._call_callbacks("full_deathed")
-                self.world.full_deathed = True
+                world.full_deathed = True
 
     def update_cure(self) -> None:
         """更新解药研发进度."""
-        if self.world.full_deathed:
+        world = self.world
+        if world.full_deathed:
             return
-        if not self.world.disease_detected and random_boolean(
-            self.world.disease.severity,
+        if not world.disease_detected and random_boolean(
+            world.readonly_disease.severity,
         ):
             self._call_callbacks("disease_detected")
-            self.world.disease_detected = True
-        if self.world.disease_detected:
-            base_cure = (self.world.cure_importance + 1) + (
-                1 + self.world.cure_investment
+            world.disease_detected = True
+        if world.disease_detected:
+            base_cure = (world.cure_importance + 1) + (
+                1 + world.cure_investment
             )
-            base_cure *= 1 - self.world.disease.cure_resistance.pct_to_float()
-            self.world.cure_money += base_cure * max(1.01, self.world.cure_importance)
-            self.world.cure_required_money += round(
-                self.world.disease.severity.pct_to_float() * 100,
+            base_cure *= 1 - world.disease.cure_resistance.pct_to_float()
+            world.cure_money += base_cure * max(1.01, world.cure_importance)
+            world.cure_required_money += round(
+                world.disease.severity.pct_to_float() * 100,
             )
-            self.world.cure_importance += self.world.disease.severity + abs(
-                self.world.disease.lethality.apply_stddev(
-                    self.world.disease.lethality.value,
+            world.cure_importance += world.disease.severity + abs(
+                world.disease.lethality.apply_stddev(
+                    world.disease.lethality.value,
                 ),
             )
-            if self.world.cure_money >= self.world.cure_required_money:
-                self.world.cure_money = self.world.cure_required_money
-                self.world.disease.infectivity.value = 0  # 将传播性设置为0
-                self.world.disease.infectivity.stddev = 0  # 设置标准差为0(不再随机感染)
+            if world.cure_money >= world.cure_required_money:
+                world.cure_money = world.cure_required_money
+                world.disease.infectivity.value = 0  # 将传播性设置为0
+                world.disease.infectivity.stddev = 0  # 设置标准差为0(不再随机感染)
                 self._call_callbacks("cure_finished")
-                self.world.cure_finished = True
+                world.cure_finished = True
 
     def update_by_genecode(self) -> None:
         """根据长期效用基因代码更新数值."""
-        for gene_code in self.world.disease.gene_codes:
+        world = self.world
+        for gene_code in world.readonly_disease.gene_codes:
             if isinstance(gene_code, LongTermGeneCode):
-                gene_code.apply_effects(self.world)
+                gene_code.apply_effects(world)
 
     def update_healing(self) -> None:
         """更新每天治愈人数."""
-        if self.world.cure_money >= self.world.cure_required_money:
+        world = self.world
+        if world.cure_money >= world.cure_required_money:
             heal_rate = 0.25  # 每天治愈25%的感染者
-            for country in self.world.countries:
+            for country in world.countries:
                 healed = round(country.infected_population * heal_rate)
                 if healed < 1 and country.infected_population > 0:
                     healed = country.infected_population
                 country.infected_population -= healed
                 country.infected_population = max(country.infected_population, 0)
-            if self.world.total_infections() <= 0:
+            if world.total_infections() <= 0:
                 self._call_callbacks("full_healthed")
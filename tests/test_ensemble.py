@@ -0,0 +1,78 @@
+"""EnsembleStatistics 的测试."""
+
+import pickle
+import random
+import statistics
+
+from game import rate
+from game.ensemble import EnsembleStatistics, QuantileSketch, RunningStats
+
+from .utils import build_world
+
+
+def test_running_stats_merge_matches_batch() -> None:
+    generator = random.Random(0)
+    values = [generator.expovariate(0.01) for _ in range(1000)]
+    first, second = RunningStats(), RunningStats()
+    for value in values[:300]:
+        first.push(value)
+    for value in values[300:]:
+        second.push(value)
+    first.merge(second)
+    assert abs(first.mean - statistics.mean(values)) < 1e-9
+    assert abs(first.variance - statistics.variance(values)) < 1e-6 * first.variance
+
+
+def test_quantile_sketch_relative_error() -> None:
+    sketch = QuantileSketch(0.01)
+    for value in range(1, 10001):
+        sketch.push(value)
+    assert abs(sketch.quantile(0.5) - 5000) <= 0.01 * 5000 + 1
+
+
+def test_forks_are_not_tracked() -> None:
+    rate.seed(2)
+    ensemble = EnsembleStatistics()
+    for _ in range(20):
+        world = build_world(countries=3)
+        ensemble.attach(world)
+        for _ in range(5):
+            world.update()
+        world.rollout(5, callbacks=True)
+        ensemble.finish(world)
+    assert ensemble.replicas == 20
+    assert len(ensemble._active) == 0
+    assert len(ensemble.world_values) == 5
+    assert ensemble.world_values[0]["total_deaths"].count == 20
+
+
+def test_attaching_forks_of_attached_world_counts_once() -> None:
+    rate.seed(5)
+    ensemble = EnsembleStatistics()
+    base = build_world(countries=3)
+    ensemble.attach(base)
+    for _ in range(3):
+        world = base.fork()
+        ensemble.attach(world)
+        world.update()
+        ensemble.finish(world)
+    assert ensemble.replicas == 3
+    assert ensemble.world_values[0]["total_deaths"].count == 3
+
+
+def test_merge_after_pickle() -> None:
+    rate.seed(4)
+    parts = []
+    for _ in range(2):
+        ensemble = EnsembleStatistics()
+        for _ in range(3):
+            world = build_world(countries=3)
+            ensemble.attach(world)
+            for _ in range(10):
+                world.update()
+            ensemble.finish(world)
+        parts.append(pickle.loads(pickle.dumps(ensemble)))
+    parts[0].merge(parts[1])
+    assert parts[0].replicas == 6
+    assert parts[0].world_values[9]["total_infections"].count == 6
+    assert parts[0].peak_infections.stats.count == 6
@@ -0,0 +1,85 @@
+"""MicroUpdater 的测试."""
+
+from game import rate
+from game.diseases import Disease
+from game.micro import MicroUpdater, Population, bernoulli_mask
+from game.rate import PctWithSelfStddevNonLinearDecayNoNeg, PctWithStddev
+from game.world import Country, World
+
+from .utils import build_world
+
+
+def test_bernoulli_mask_rates() -> None:
+    rate.seed(0)
+    size = 1_000_000
+    assert abs(bernoulli_mask(size, 0.3).bit_count() / size - 0.3) < 0.005
+    assert abs(bernoulli_mask(size, 0.001).bit_count() - 1000) < 150
+    assert bernoulli_mask(size, 0.0) == 0
+    assert bernoulli_mask(size, 1.0) == (1 << size) - 1
+
+
+def test_tiny_rates_on_large_population() -> None:
+    rate.seed(0)
+    disease = Disease(
+        "test",
+        infectivity=PctWithSelfStddevNonLinearDecayNoNeg(1, 30),
+        severity=PctWithStddev(0),
+        environmental_conditions={
+            "Hot": PctWithStddev(0),
+            "Cold": PctWithStddev(0),
+            "Humid": PctWithStddev(0),
+            "Arid": PctWithStddev(0),
+        },
+    )
+    # 每天期望感染1人, 概率为1e-7
+    world = World(disease, [Country("large", 10_000_000, 1e-5, 0, 0)])
+    MicroUpdater.install(world)
+    for _ in range(50):
+        world.update()
+    deaths = world.readonly_countries[0].deathed_population
+    assert 25 <= deaths <= 80
+
+
+def test_healed_can_be_reinfected() -> None:
+    population = Population(100, infected=100)
+    population.heal(1.0)
+    assert population.infected == 0
+    assert population.susceptible == population.everyone
+    assert population.healed == population.everyone
+
+
+def test_micro_aggregates_and_keeps_callbacks() -> None:
+    rate.seed(1)
+    world = build_world(countries=3, lethality=20)
+    days: list[int] = []
+    world.updater.register_callback("on_update", lambda w: days.append(w.time))
+    MicroUpdater.install(world)
+    fork = world.fork()
+    for _ in range(10):
+        world.update()
+    assert days == list(range(1, 11))
+    for country, population in zip(
+        world.readonly_countries,
+        world.updater.populations,
+        strict=True,
+    ):
+        assert country.infected_population == population.infected.bit_count()
+        assert country.deathed_population == population.dead.bit_count()
+    assert world.total_deaths() > 0
+    assert fork.total_deaths() == 0
+
+
+def test_counter_writes_are_reconciled() -> None:
+    rate.seed(2)
+    world = build_world(countries=2)
+    updater = MicroUpdater.install(world)
+    world.countries[0].infected_population = 500
+    world.countries[1].deathed_population = 40
+    updater.update_infection()
+    assert world.readonly_countries[0].infected_population >= 500
+    assert world.readonly_countries[1].deathed_population == 40
+    world.countries[0].infected_population = 0
+    updater.update_healing()
+    updater.update_death()
+    assert world.readonly_countries[0].infected_population == 0
+    assert updater.populations[0].infected == 0
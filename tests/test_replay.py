@@ -0,0 +1,144 @@
+"""Recorder 与 Replayer 的测试."""
+
+import random
+
+import pytest
+
+from game import rate
+from game.gene_codes import GeneCode
+from game.rate import (
+    PctWithSelfStddevNonLinearDecayNoNeg,
+    PctWithStddev,
+    PctWithStddevNonLinearDecayNoNeg,
+)
+from game.replay import Recorder, Replayer, ReplayLog
+from game.symptoms import Symptoms, SymptomsTree
+from game.world import World
+
+from .utils import country_state
+
+
+def _params() -> tuple[dict, list[dict]]:
+    disease = {
+        "name": "test",
+        "infectivity": PctWithSelfStddevNonLinearDecayNoNeg(1, 30),
+        "severity": PctWithStddev(5),
+        "lethality": PctWithStddevNonLinearDecayNoNeg(2),
+        "environmental_conditions": {
+            "Hot": PctWithStddev(10),
+            "Cold": PctWithStddev(10),
+            "Humid": PctWithStddev(100),
+            "Arid": PctWithStddev(100),
+        },
+    }
+    countries = [
+        {
+            "name": f"country{index}",
+            "population": 10000 + index * 37,
+            "density": 0.5 + index % 3,
+            "wealth": index % 7,
+            "cure_budget": 10,
+        }
+        for index in range(5)
+    ]
+    return disease, countries
+
+
+def _tree() -> SymptomsTree:
+    tree = SymptomsTree()
+    tree.add_root(Symptoms("Coughing", 3, infectivity=5, severity=1))
+    return tree
+
+
+def _setup(world: World) -> None:
+    world.countries[0].infected_population = 10
+
+
+def _state(world: World) -> tuple:
+    return (
+        world.time,
+        country_state(world),
+        world.cure_money,
+        world.cure_investment,
+        world.readonly_disease.infectivity.value,
+    )
+
+
+def _record(days: int = 30) -> tuple[Recorder, list[tuple]]:
+    disease, countries = _params()
+    recorder = Recorder(disease, countries, tree_factory=_tree, seed=7, setup=_setup)
+    recorder.register_callback(
+        "disease_detected",
+        lambda world: recorder.set("world", "cure_investment", 5),
+    )
+    states = [_state(recorder.world)]
+    for day in range(days):
+        if day == 3:
+            recorder.evolve_symptom("Coughing")
+        recorder.update()
+        states.append(_state(recorder.world))
+    return recorder, states
+
+
+def test_replay_reproduces_recorded_run() -> None:
+    recorder, states = _record()
+    assert recorder.world.disease_detected
+    assert any(action[1] == "disease_detected" for action in recorder.log.actions)
+    log = ReplayLog.loads(recorder.log.dumps())
+    player = Replayer(log, tree_factory=_tree, setup=_setup, keyframe_interval=10)
+    assert _state(player.run()) == states[-1]
+    for tick in (25, 5, 0, 17, 30, 12):
+        assert _state(player.seek(tick)) == states[tick]
+
+
+def test_omitted_params_use_fresh_defaults() -> None:
+    _, countries = _params()
+    recorder = Recorder(
+        {"name": "x", "severity": PctWithStddev(1)},
+        countries,
+        tree_factory=_tree,
+        seed=3,
+        setup=_setup,
+    )
+    recorder.evolve_symptom("Coughing")
+    recorder.add_gene_code(GeneCode(base_cross_country_transmission={"Air": 2}))
+    for _ in range(10):
+        recorder.update()
+    recorded = (
+        _state(recorder.world),
+        dict(recorder.world.readonly_disease.base_cross_country_transmission),
+    )
+    world = Replayer(recorder.log, tree_factory=_tree, setup=_setup).run()
+    assert world.readonly_disease.infectivity is not recorder.world.readonly_disease.infectivity
+    assert (_state(world), dict(world.readonly_disease.base_cross_country_transmission)) == recorded
+    assert (
+        _state(recorder.world),
+        dict(recorder.world.readonly_disease.base_cross_country_transmission),
+    ) == recorded
+
+
+def test_evolve_applies_symptom_effects() -> None:
+    recorder, _ = _record(days=0)
+    before = recorder.world.readonly_disease.infectivity.value
+    recorder.evolve_symptom("Coughing")
+    assert recorder.world.readonly_disease.infectivity.value == before + 5
+    assert not _tree().roots[0].symptom.evolved  # 不影响共享的症状实例
+
+
+def test_perform_outside_callbacks_during_update_is_refused() -> None:
+    disease, countries = _params()
+    recorder = Recorder(disease, countries, seed=1, setup=_setup)
+    recorder.world.updater.register_callback(
+        "on_update",
+        lambda world: recorder.set("world", "cure_investment", 1),
+    )
+    with pytest.raises(RuntimeError):
+        recorder.update()
+
+
+def test_global_rng_is_restored() -> None:
+    rate.rng.seed(123)
+    expected = random.Random(123).random()
+    recorder, _ = _record(days=5)
+    Replayer(recorder.log, tree_factory=_tree, setup=_setup).run()
+    assert rate.rng.random() == expected
@@ -0,0 +1,90 @@
+"""Scheduler 的测试."""
+
+import pytest
+
+from game.gene_codes import GeneCode, LongTermGeneCode
+from game.world import World
+
+from .utils import build_world
+
+
+def _record(log: list, name: str):  # noqa: ANN202
+    return lambda world: log.append((name, world.time))
+
+
+def test_events_fire_in_order_on_due_tick() -> None:
+    world = build_world(countries=2)
+    log: list = []
+    world.scheduler.schedule(3, _record(log, "b"))
+    world.scheduler.schedule(2, _record(log, "a"))
+    world.scheduler.schedule(3, _record(log, "c"))
+    for _ in range(5):
+        world.update()
+    assert log == [("a", 2), ("b", 3), ("c", 3)]
+    assert len(world.scheduler) == 0
+
+
+def test_periodic_event_and_cancel() -> None:
+    world = build_world(countries=2)
+    log: list = []
+    event_id = world.scheduler.schedule(2, _record(log, "tick"), period=4)
+    world.scheduler.schedule(11, lambda w: w.scheduler.cancel(event_id))
+    for _ in range(20):
+        world.update()
+    assert log == [("tick", 2), ("tick", 6), ("tick", 10)]
+    assert len(world.scheduler) == 0
+
+
+def test_missed_periodic_event_fires_once() -> None:
+    world = build_world(countries=2)
+    world.time = 100
+    log: list = []
+    world.scheduler.schedule(0, _record(log, "tick"), period=3)
+    world.update()
+    world.update()
+    world.update()
+    assert log == [("tick", 101), ("tick", 102)]
+
+
+def test_cancel_is_idempotent_and_ignores_fired_events() -> None:
+    world = build_world(countries=2)
+    log: list = []
+    fired = world.scheduler.schedule(1, _record(log, "fired"))
+    pending = world.scheduler.schedule(5, _record(log, "pending"))
+    world.update()
+    world.scheduler.cancel(fired)
+    assert len(world.scheduler) == 1
+    world.scheduler.cancel(pending)
+    world.scheduler.cancel(pending)
+    assert len(world.scheduler) == 0
+    for _ in range(5):
+        world.update()
+    assert log == [("fired", 1)]
+    assert world.scheduler.next_tick() is None
+
+
+def test_gene_code_activation_and_expiry() -> None:
+    world = build_world(countries=2)
+    gene_code = LongTermGeneCode({"cure_investment": lambda w: w.cure_investment + 1})
+    world.scheduler.schedule_gene_code(5, gene_code, duration=3)
+    for _ in range(20):
+        world.update()
+    assert world.cure_investment == 3
+    assert gene_code not in world.readonly_disease.gene_codes
+
+
+def test_rejected_gene_code_is_not_scheduled() -> None:
+    world: World = build_world(countries=2)
+    with pytest.raises(ValueError, match="长期效用"):
+        world.scheduler.schedule_gene_code(1, GeneCode(), duration=3)
+    assert len(world.scheduler) == 0
+
+
+def test_fork_copies_queue() -> None:
+    world = build_world(countries=2)
+    log: list = []
+    world.scheduler.schedule(1, _record(log, "event"))
+    fork = world.fork()
+    fork.update()
+    assert log == [("event", 1)]
+    assert len(world.scheduler) == 1
@@ -0,0 +1,95 @@
+"""ShardedExecutor 的测试."""
+
+import multiprocessing
+from multiprocessing import shared_memory
+
+import pytest
+
+from game import rate
+from game.micro import MicroUpdater
+from game.sharding import ShardedExecutor
+from game.world import Country, World
+
+from .utils import build_world, country_state
+
+DAYS = 30
+
+
+def _run_serial() -> tuple[list[tuple[int, int]], float]:
+    rate.seed(1)
+    world = build_world(countries=50)
+    for _ in range(DAYS):
+        world.update()
+    return country_state(world), world.cure_money
+
+
+@pytest.mark.parametrize("workers", [1, 3, 8])
+def test_sharded_matches_serial(workers: int) -> None:
+    expected = _run_serial()
+    rate.seed(1)
+    world = build_world(countries=50)
+    with ShardedExecutor(world, workers) as executor:
+        for _ in range(DAYS):
+            executor.update()
+        assert (country_state(world), world.cure_money) == expected
+    assert (country_state(world), world.cure_money) == expected
+    assert all(type(country) is Country for country in world.readonly_countries)
+
+
+def test_countries_read_and_write_shared_memory() -> None:
+    world = build_world(countries=4)
+    with ShardedExecutor(world, 2) as executor:
+        world.countries[2].internal_infectivity = 0.0
+        executor.update()
+        assert world.readonly_countries[2].infected_population == 0
+        assert world.readonly_countries[1].infected_population > 0
+        fork = world.fork()
+        assert type(fork.readonly_countries[1]) is Country
+        executor.update()
+        assert fork.readonly_countries[1].infected_population != (
+            world.readonly_countries[1].infected_population
+        )
+    assert world.readonly_countries[2].internal_infectivity == 0.0
+
+
+def test_close_unlinks_shared_memory() -> None:
+    executor = ShardedExecutor(build_world(countries=4), 2)
+    names = [memory.name for memory in executor._memories]
+    executor.close()
+    executor.close()
+    for name in names:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+
+
+def test_failed_start_releases_resources(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[str] = []
+    original = shared_memory.SharedMemory.__init__
+
+    def record(self: shared_memory.SharedMemory, *args: object, **kwargs: object) -> None:
+        original(self, *args, **kwargs)
+        created.append(self.name)
+
+    def fail(_self: multiprocessing.Process) -> None:
+        msg = "start failed"
+        raise RuntimeError(msg)
+
+    monkeypatch.setattr(shared_memory.SharedMemory, "__init__", record)
+    monkeypatch.setattr(multiprocessing.Process, "start", fail)
+    world: World = build_world(countries=4)
+    with pytest.raises(RuntimeError):
+        ShardedExecutor(world, 2)
+    monkeypatch.undo()
+
+    assert len(created) == 2
+    for name in created:
+        with pytest.raises(FileNotFoundError):
+            shared_memory.SharedMemory(name=name)
+    assert all(type(country) is Country for country in world.readonly_countries)
+
+
+def test_rejects_other_updaters() -> None:
+    world = build_world(countries=4)
+    MicroUpdater.install(world)
+    with pytest.raises(TypeError, match="MicroUpdater"):
+        ShardedExecutor(world, 2)
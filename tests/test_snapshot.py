@@ -0,0 +1,110 @@
+"""World.snapshot 的测试."""
+
+import threading
+
+from game import rate
+from game.sharding import ShardedExecutor
+from game.snapshot import WorldSnapshot
+
+from .utils import build_world, country_state
+
+
+def _check(snapshot: WorldSnapshot) -> None:
+    assert snapshot.epoch == snapshot.time - 1
+    assert snapshot.total_infections == sum(
+        country.infected_population for country in snapshot.countries
+    )
+    assert snapshot.total_deaths == sum(
+        country.deathed_population for country in snapshot.countries
+    )
+
+
+def test_epoch_increases_once_per_tick() -> None:
+    world = build_world(countries=3)
+    world.publish_snapshots = True
+    epochs = []
+    for _ in range(5):
+        world.update()
+        epochs.append(world.snapshot.epoch)
+    assert epochs == [0, 1, 2, 3, 4]
+
+
+def test_snapshot_is_unchanged_by_later_updates() -> None:
+    rate.seed(1)
+    world = build_world(countries=3)
+    world.publish_snapshots = True
+    for _ in range(3):
+        world.update()
+    snapshot = world.snapshot
+    values = (
+        snapshot.time,
+        snapshot.cure_investment,
+        [tuple(country) for country in snapshot.countries],
+        snapshot.disease.infectivity,
+        dict(snapshot.disease.environmental_conditions),
+    )
+    world.cure_investment = 7
+    world.disease.infectivity.value = 0.5
+    for _ in range(5):
+        world.update()
+    assert world.snapshot is not snapshot
+    assert (
+        snapshot.time,
+        snapshot.cure_investment,
+        [tuple(country) for country in snapshot.countries],
+        snapshot.disease.infectivity,
+        dict(snapshot.disease.environmental_conditions),
+    ) == values
+    assert world.snapshot.cure_investment == 7
+
+
+def test_fork_does_not_publish() -> None:
+    world = build_world(countries=3)
+    world.publish_snapshots = True
+    world.update()
+    fork = world.rollout(5)
+    assert fork.snapshot is None
+    assert world.snapshot.time == 1
+
+
+def test_sharded_update_publishes() -> None:
+    world = build_world(countries=6)
+    world.publish_snapshots = True
+    with ShardedExecutor(world, 2) as executor:
+        for _ in range(3):
+            executor.update()
+        snapshot = world.snapshot
+        assert snapshot.epoch == 2
+        assert [
+            (country.infected_population, country.deathed_population)
+            for country in snapshot.countries
+        ] == country_state(world)
+    _check(snapshot)
+
+
+def test_reader_thread_sees_consistent_snapshots() -> None:
+    rate.seed(2)
+    world = build_world(countries=10)
+    world.publish_snapshots = True
+    world.update()
+    done = threading.Event()
+    seen: list[int] = []
+    errors: list[BaseException] = []
+
+    def read() -> None:
+        try:
+            while not done.is_set():
+                snapshot = world.snapshot
+                _check(snapshot)
+                seen.append(snapshot.epoch)
+        except BaseException as error:  # noqa: BLE001
+            errors.append(error)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    for _ in range(200):
+        world.update()
+    done.set()
+    reader.join()
+    assert not errors
+    assert seen == sorted(seen)
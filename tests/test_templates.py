@@ -0,0 +1,89 @@
+"""WorldTemplate 的测试."""
+
+import pytest
+
+from game.gene_codes import GeneCode
+from game.rate import PctWithStddev
+from game.templates import WorldTemplate
+
+
+def _template() -> WorldTemplate:
+    return WorldTemplate(
+        {"name": "test", "severity": PctWithStddev(5)},
+        [
+            {
+                "name": "a",
+                "population": 1000,
+                "environmental_conditions": {
+                    "Hot": True,
+                    "Cold": False,
+                    "Humid": False,
+                    "Arid": False,
+                },
+            },
+            {"name": "b", "population": 2000},
+        ],
+        {"cure_required_money": 5000},
+    )
+
+
+def test_instances_are_isolated() -> None:
+    template = _template()
+    first = template.instantiate()
+    second = template.instantiate()
+
+    first.countries[0].infected_population = 10
+    first.disease.infectivity.value = 0.5
+    first.disease.base_cross_country_transmission["Air"] = 9
+
+    assert second.readonly_countries[0].infected_population == 0
+    assert second.readonly_disease.infectivity.value == 0.01
+    assert second.readonly_disease.base_cross_country_transmission["Air"] == 1
+    assert template.instantiate().readonly_countries[0].infected_population == 0
+    with pytest.raises(TypeError):
+        first.countries[0].environment["Hot"] = False  # 环境条件只读, 实例之间共享
+
+
+def test_gene_codes_are_frozen_copies() -> None:
+    gene_code = GeneCode(base_cross_country_transmission={"Air": 2})
+    template = WorldTemplate({"name": "test", "gene_codes": [gene_code]}, [])
+    gene_code.base_cross_country_transmission["Air"] = 100
+
+    frozen = template.disease_params["gene_codes"][0]
+    assert frozen is not gene_code
+    assert frozen.base_cross_country_transmission["Air"] == 2
+    with pytest.raises(TypeError):
+        frozen.base_cross_country_transmission["Air"] = 3
+    assert template.instantiate().readonly_disease.base_cross_country_transmission["Air"] == 3
+
+
+def test_override_deltas() -> None:
+    template = _template()
+    overridden = template.override(
+        disease={"severity": PctWithStddev(20)},
+        countries={1: {"population": 5000, "wealth": 3.0}},
+        world={"cure_investment": 4},
+    )
+    world = overridden.instantiate()
+
+    assert world.readonly_disease.severity.value == 0.2
+    assert world.readonly_disease.name == "test"
+    assert world.readonly_countries[1].population == 5000
+    assert world.readonly_countries[1].wealth == 3.0
+    assert world.readonly_countries[1].name == "b"
+    assert world.cure_investment == 4
+    assert world.cure_required_money == 5000
+    assert world.total_population == 6000
+
+    # 未修改的部分与原模板共享, 原模板不受影响
+    assert overridden._prototype.readonly_countries[0] is template._prototype.readonly_countries[0]
+    original = template.instantiate()
+    assert original.readonly_disease.severity.value == 0.05
+    assert original.readonly_countries[1].population == 2000
+    assert original.cure_investment == 0
+    assert original.total_population == 3000
+
+
+def test_override_rejects_unknown_world_keys() -> None:
+    with pytest.raises(TypeError, match="unknown_key"):
+        _template().override(world={"unknown_key": 1})
@@ -0,0 +1,90 @@
+"""World.fork 写时复制的测试."""
+
+from game import rate
+from game.world import World
+
+from .utils import build_world, country_state
+
+
+def _disease_state(world: World) -> tuple:
+    disease = world.readonly_disease
+    return (
+        disease.infectivity.value,
+        disease.lethality.value,
+        disease.lethality.stddev,
+        disease.cure_resistance.value,
+    )
+
+
+def test_fork_leaves_parent_unchanged() -> None:
+    rate.seed(1)
+    world = build_world()
+    for _ in range(5):
+        world.update()
+    countries = country_state(world)
+    disease = _disease_state(world)
+
+    fork = world.rollout(30)
+
+    assert fork.time == 35
+    assert world.time == 5
+    assert country_state(world) == countries
+    assert _disease_state(world) == disease
+
+
+def test_direct_writes_on_fork_do_not_leak() -> None:
+    world = build_world()
+    fork = world.fork()
+
+    fork.scheduler.schedule(1, lambda w: setattr(w.countries[0], "internal_infectivity", 0.0))
+    fork.updater.register_callback(
+        "on_update",
+        lambda w: setattr(w.disease.cure_resistance, "value", 0.5),
+    )
+    fork.update()
+
+    assert fork.readonly_countries[0].internal_infectivity == 0.0
+    assert world.readonly_countries[0].internal_infectivity == 1.0
+    assert fork.readonly_disease.cure_resistance.value == 0.5
+    assert world.readonly_disease.cure_resistance.value == 0.0
+
+
+def test_environment_writes_on_fork_do_not_leak() -> None:
+    world = build_world()
+    fork = world.fork()
+
+    fork.countries[1].environment["Arid"] = True
+
+    assert fork.readonly_countries[1].environment["Arid"]
+    assert not world.readonly_countries[1].environment["Arid"]
+
+
+def test_references_taken_before_fork_are_replaced() -> None:
+    world = build_world()
+    country = world.countries[0]
+    fork = world.fork()
+    world.update()
+
+    # 原世界访问后得到副本, 旧引用仍与分叉世界共享
+    assert country is not world.readonly_countries[0]
+    assert country is fork.readonly_countries[0]
+
+
+def test_parent_writes_do_not_leak_into_fork() -> None:
+    world = build_world()
+    fork = world.fork()
+
+    world.countries[1].infected_population = 123
+    world.disease.infectivity.value = 0.5
+
+    assert fork.readonly_countries[1].infected_population == 0
+    assert fork.readonly_disease.infectivity.value == 0.01
+
+
+def test_fork_is_deterministic() -> None:
+    world = build_world()
+    rate.seed(3)
+    first = world.rollout(30)
+    rate.seed(3)
+    second = world.rollout(30)
+    assert country_state(first) == country_state(second)
@@ -0,0 +1,52 @@
+"""测试共用的辅助函数."""
+
+from __future__ import annotations
+
+from game.diseases import Disease
+from game.rate import (
+    PctWithSelfStddevNonLinearDecayNoNeg,
+    PctWithStddev,
+    PctWithStddevNonLinearDecayNoNeg,
+)
+from game.world import Country, World
+
+
+def build_world(countries: int = 20, lethality: int = 2) -> World:
+    disease = Disease(
+        "test",
+        infectivity=PctWithSelfStddevNonLinearDecayNoNeg(1, 30),
+        severity=PctWithStddev(5),
+        lethality=PctWithStddevNonLinearDecayNoNeg(lethality),
+        environmental_conditions={
+            "Hot": PctWithStddev(10),
+            "Cold": PctWithStddev(10),
+            "Humid": PctWithStddev(100),
+            "Arid": PctWithStddev(100),
+        },
+    )
+    return World(
+        disease,
+        [
+            Country(
+                f"country{index}",
+                10000 + index * 37,
+                0.5 + index % 3,
+                index % 7,
+                10,
+                environmental_conditions={
+                    "Hot": index % 2 == 0,
+                    "Cold": False,
+                    "Humid": index % 3 == 0,
+                    "Arid": False,
+                },
+            )
+            for index in range(countries)
+        ],
+    )
+
+
+def country_state(world: World) -> list[tuple[int, int]]:
+    return [
+        (country.infected_population, country.deathed_population)
+        for country in world.readonly_countries
+    ]